@@ -37,26 +37,42 @@ NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
-from twisted.internet import reactor, protocol, ssl, task
+from twisted.internet import reactor, protocol, ssl, task, threads, defer
 from twisted.internet.protocol import Protocol, ReconnectingClientFactory
 from twisted.words.protocols import irc
+try:
+    from twisted.internet import inotify  # Linux only, we fall back to polling without it
+except ImportError:
+    inotify = None
 from twisted.python import filepath, log
 from twisted.python.logfile import DailyLogFile
 from twisted.application import internet, service
 from datetime import datetime, timedelta
 import site     # to help find botconf
+import sys      # for interning role/race codes
 import base64
 import time     # for $time and rate limiting
 import os       # for check path exists (dumplogs), and chmod
 import stat     # for chmod mode bits
 import re       # for hello, and other things.
 import urllib.request, urllib.parse, urllib.error   # for dealing with NH4 variants' #&$#@ spaces in filenames.
-import shelve   # for persistent $tell messages
+import shelve   # for $tell messages left before we kept them in sqlite
+import sqlite3  # for persistent $tell messages
 import random   # for $rng and friends
-import glob     # for matching in $whereis
+import glob     # for scanning the inprogress and whereis dirs
 import json     # for tournament scoreboard things
+import hashlib  # for recognising an xlogfile we've checkpointed
+import zlib     # for compressing and checksumming framed query responses
+import multiprocessing  # for replaying big xlogfiles on several cores
+import mmap     # for reading xlogfiles without a copy per line
+import array    # for compact per-player counters
+import bisect   # for slave latency histograms
 import resource  # for memory usage in status command
+import threading  # for locking state shared with API worker threads
+from collections import OrderedDict, deque  # for LRU caches, outbound queues
 import requests  # for GitHub API
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import xml.etree.ElementTree as ET  # for parsing GitHub Atom feeds
 
 # command trigger - this should be in tnntbotconf - next time.
@@ -76,6 +92,55 @@ except ImportError:
 # TNNT API configuration
 TNNT_API_BASE = "http://127.0.0.1:8000/api"  # Use localhost for same server
 TNNT_API_HEADERS = {"Host": "tnnt.org"}  # Required for Django ALLOWED_HOSTS
+TNNT_API_FEED = "/achievements/feed/"  # bulk "awards since cursor" feed, if the API has one
+try:
+    from tnntbotconf import API_CONCURRENCY  # max TNNT API requests in flight at once
+except ImportError:
+    API_CONCURRENCY = 16
+try:
+    from tnntbotconf import API_DIRTY_POLLING  # only refetch players whose scoreboard row changed
+except ImportError:
+    API_DIRTY_POLLING = True
+try:
+    from tnntbotconf import API_SWEEP_SIZE  # unchanged players refetched per poll, round-robin
+except ImportError:
+    API_SWEEP_SIZE = 50
+try:
+    from tnntbotconf import HTTP_RETRIES  # retries for failed connections and 502/503/504 responses
+except ImportError:
+    HTTP_RETRIES = 2
+try:
+    from tnntbotconf import HTTP_BACKOFF  # backoff factor between retries (seconds)
+except ImportError:
+    HTTP_BACKOFF = 0.5
+try:
+    from tnntbotconf import XLOG_BULK_WORKERS  # processes for replaying a big xlogfile at startup, 1 to disable
+except ImportError:
+    XLOG_BULK_WORKERS = os.cpu_count() or 1
+try:
+    from tnntbotconf import XLOG_BULK_MIN_SIZE  # bytes of xlogfile to replay before we bother with XLOG_BULK_WORKERS
+except ImportError:
+    XLOG_BULK_MIN_SIZE = 32 * 1024 * 1024
+try:
+    from tnntbotconf import XLOG_BULK_TIMEOUT  # seconds to wait for XLOG_BULK_WORKERS before reading line by line
+except ImportError:
+    XLOG_BULK_TIMEOUT = 300
+try:
+    from tnntbotconf import REACTOR_LAG_PROBE  # measure how long the reactor gets blocked, for debugging
+except ImportError:
+    REACTOR_LAG_PROBE = False
+try:
+    from tnntbotconf import OUTBOUND_RATE  # lines per second we send to IRC, on average
+except ImportError:
+    OUTBOUND_RATE = 1.0
+try:
+    from tnntbotconf import OUTBOUND_BURST  # lines we can send at once before OUTBOUND_RATE kicks in
+except ImportError:
+    OUTBOUND_BURST = 4
+try:
+    from tnntbotconf import QUERY_TIMEOUT  # longest we wait for a slave to answer a $who/$whereis/etc (seconds)
+except ImportError:
+    QUERY_TIMEOUT = 5
 try:
     from tnntbotconf import SPAMCHANNELS
 except ImportError:
@@ -123,6 +188,9 @@ if not SLAVE:
     NETHACK_GENDERS = ["Mal", "Fem"]
 
 CLANTAGJSON = BOTDIR + "/clantag.json"
+APISTATEJSON = BOTDIR + "/apistate.json"  # TNNT API tracking state, saved after every poll
+XLOGSTATEJSON = BOTDIR + "/xlogstate.json"  # xlogfile aggregates, so startup needn't replay the whole file
+TELLDB = BOTDIR + "/tellmsg.sqlite"  # $tell messages waiting for their recipients
 
 # Rate limiting constants
 RATE_LIMIT_WINDOW = 60  # Rate limiting time window in seconds
@@ -142,6 +210,36 @@ LOG_POLL_INTERVAL = 3  # seconds between log file checks
 NICK_CHECK_INTERVAL = 30  # seconds between nick checks
 SUMMARY_UPDATE_INTERVAL = 300  # seconds between summary updates (5 minutes)
 STALE_BURST_TIMEOUT = 3600  # 1 hour before removing burst protection data
+API_POLL_INTERVAL = 300  # seconds between TNNT API polls (5 minutes)
+REACTOR_LAG_INTERVAL = 1  # seconds between reactor lag probes
+REACTOR_LAG_WARN = 0.5  # log when the reactor was blocked for longer than this (seconds)
+API_FEED_RETRY = 3600  # seconds before checking again for a bulk award feed the API didn't have
+LOOKUP_CACHE_SIZE = 256  # on-demand $score/$clanscore API lookups to remember
+LOOKUP_CACHE_TTL = 300  # seconds to remember a player/clan that exists
+LOOKUP_NEGATIVE_TTL = 60  # seconds to remember a player/clan that doesn't
+CHECKPOINT_INTERVAL = 300  # seconds between xlogfile checkpoints
+CHECKPOINT_HASH_BYTES = 4096  # bytes before the checkpoint offset hashed to check it's the same file
+MMAP_RELEASE_BYTES = 1024 * 1024  # how much of a mapped xlogfile we read before giving the pages back
+STATS_SLACK = 300  # seconds early or late a scheduled hstats/dstats can run and still report the hour/day just gone
+STATS_MAX_PERIOD = {"h": 72, "d": 30}  # longest $stats <N>h / <N>d
+OUTBOUND_MAX_QUEUE = 100  # lines waiting for one target before we drop the least important
+OUTBOUND_MERGE_DEPTH = 5  # lines waiting for one target before a player's awards are merged into one line
+QUERY_TIMEOUT_MIN = 1.0  # shortest we wait for a slave, however quick it usually is (seconds)
+QUERY_LATENCY_ALPHA = 0.125  # weight of the newest answer in a slave's average latency
+SLAVE_DOWN_MISSES = 3  # queries in a row a slave can miss before we stop waiting for it
+SLAVE_PROBE_INTERVAL = 300  # seconds between queries we still send a down slave, to see if it's back
+QUERY_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5)  # upper bounds of the slave latency histogram (seconds)
+LIVE_GAMES_RESCAN = 300  # seconds between full rescans of the inprogress/whereis dirs when inotify is watching them
+QUERY_CACHE_SIZE = 512  # slave answers the master remembers
+QUERY_CACHE_TTL = 120  # longest we reuse a slave's answer without asking again, even if it hasn't said it changed (seconds)
+
+# Outbound line priorities, most important first
+OUT_URGENT = 0  # command responses, countdowns, milestones
+OUT_ASCENSION = 1
+OUT_DEATH = 2  # and other xlogfile game ends
+OUT_ACHIEVEMENT = 3  # livelog events, API trophies/achievements, clan news
+OUT_GITHUB = 4
+OUT_PRIORITIES = 5
 
 # Game thresholds
 # Startscum definition: quit/escaped with <= 100 turns (no dumplog generated)
@@ -154,6 +252,26 @@ RE_COLOR_FG = re.compile(r'\x03\d\d')  # fg only
 RE_COLOR_END = re.compile(r'[\x1D\x03\x0f]')  # end of colour and italics
 RE_DICE_CMD = re.compile(r'^\d*d\d*$')  # dice command pattern
 RE_SPACE_COLOR = re.compile(r'^ [\x1D\x03\x0f]*')  # space and color codes
+RE_STATS_PERIOD = re.compile(r'^(\d+)([hd])$')  # $stats 6h, $stats 3d
+RE_TWO_EQUALS = {}  # delim -> pattern matching a field with more than one "=", see parse_xlogfile_line
+
+# Query ids ending in this tell slaves the master understands #F# framed responses
+FRAMED_QUERY = "F"
+# ...and this (just before the F) that it caches their answers, and wants an #I# when they change
+INVALIDATE_QUERY = "I"
+
+# Multi-server queries the master can answer from a slave's earlier answer: what
+# the answer comes from (the #I# kind that makes it stale) and how long to keep it.
+# The whereis file changes as the player moves about without telling us, so that
+# one is only kept for a few seconds.
+QUERY_CACHE_KINDS = ("inprog", "xlog")
+QUERY_CACHE = {"players" : ("inprog", QUERY_CACHE_TTL),
+               "who"     : ("inprog", QUERY_CACHE_TTL),
+               "whereis" : ("inprog", 15),
+               "asc"     : ("xlog", QUERY_CACHE_TTL),
+               "streak"  : ("xlog", QUERY_CACHE_TTL),
+               "lastasc" : ("xlog", QUERY_CACHE_TTL),
+               "lastgame": ("xlog", QUERY_CACHE_TTL)}
 
 # Logging helper with timestamps
 def tlog(message):
@@ -161,17 +279,477 @@ def tlog(message):
     timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
     print(f"{timestamp} {message}")
 
-# Custom dict class for shelve fallback
-class DictWithSync(dict):
-    """Dict subclass that supports sync() method for shelve compatibility.
+def atomic_write(path, text):
+    """Write text to path via a temp file and rename, so readers never see half a file"""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def log_fingerprint(path, offset):
+    """Identify the first offset bytes of a log by its inode and a hash of the bytes just before offset.
+    Returns None if the file is shorter than that.
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if st.st_size < offset:
+            return None
+        f.seek(max(0, offset - CHECKPOINT_HASH_BYTES))
+        data = f.read(offset - f.tell())
+    return [st.st_ino, hashlib.sha1(data).hexdigest()]
+
+# Persistent store for $tell messages
+class TellStore:
+    """$tell messages waiting for their recipients, in sqlite.
+
+    Each message is a row (forwardto, sender, timestamp, message), indexed
+    by lowercased recipient, so leaving one is a single insert and looking
+    for them a single indexed select. checkMessages() asks for everyone who
+    speaks on the channel, so the set of recipients with messages waiting is
+    also kept in memory, and "rcpt in store" never has to ask sqlite.
+    """
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS tell (id INTEGER PRIMARY KEY, rcpt TEXT NOT NULL,"
+                        " forwardto TEXT, sender TEXT, ts REAL, message TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS tell_rcpt ON tell (rcpt)")
+        self.db.commit()
+        self._loadPending()
+
+    def _loadPending(self):
+        self.pending = {rcpt for (rcpt,) in self.db.execute("SELECT DISTINCT rcpt FROM tell")}
+
+    def __len__(self):
+        """Number of recipients with messages waiting"""
+        return len(self.pending)
+
+    def __contains__(self, rcpt):
+        """Has rcpt got messages waiting? (lowercased)"""
+        return rcpt in self.pending
+
+    def add(self, rcpt, forwardto, sender, ts, message):
+        self.db.execute("INSERT INTO tell (rcpt, forwardto, sender, ts, message) VALUES (?, ?, ?, ?, ?)",
+                        (rcpt.lower(), forwardto, sender, ts, message))
+        self.db.commit()
+        self.pending.add(rcpt.lower())
+
+    def get(self, rcpt):
+        """[(forwardto, sender, ts, message), ...] waiting for rcpt, oldest first"""
+        rcpt = rcpt.lower()
+        if rcpt not in self.pending:
+            return []
+        return self.db.execute("SELECT forwardto, sender, ts, message FROM tell WHERE rcpt = ? ORDER BY id",
+                               (rcpt,)).fetchall()
+
+    def remove(self, rcpt):
+        self.db.execute("DELETE FROM tell WHERE rcpt = ?", (rcpt.lower(),))
+        self.db.commit()
+        self.pending.discard(rcpt.lower())
+
+    def migrate(self, paths):
+        """Bring in the messages from the old shelve $tell database, the first
+        of paths that opens. Only done once; returns how many messages it moved.
+        If it fails part way, nothing is moved and it's tried again next time.
+        """
+        if self.db.execute("PRAGMA user_version").fetchone()[0] > 0:
+            return 0
+        count = 0
+        for path in paths:
+            try:
+                old = shelve.open(path, flag="r")
+            except Exception:
+                continue
+            try:
+                with old:
+                    for rcpt in old.keys():
+                        for (forwardto, sender, ts, message) in old[rcpt]:
+                            self.db.execute("INSERT INTO tell (rcpt, forwardto, sender, ts, message) VALUES (?, ?, ?, ?, ?)",
+                                            (rcpt.lower(), forwardto, sender, ts, message))
+                            count += 1
+            except Exception:
+                self.db.rollback()
+                raise
+            break
+        self.db.execute("PRAGMA user_version = 1")
+        self.db.commit()
+        self._loadPending()
+        return count
+
+    def close(self):
+        self.db.close()
+
+# Shared keep-alive HTTP session for TNNT API and GitHub traffic
+class HTTPPool:
+    """Keep-alive connection pool shared by every HTTP request the bot makes.
+
+    One requests.Session with a pooled adapter per scheme, so the thousands
+    of TNNT API calls in a poll reuse a handful of TCP connections instead of
+    doing a new handshake each time. Failed connections and 502/503/504
+    responses are retried with backoff. Safe to use from worker threads.
+
+    Also remembers ETag/Last-Modified per URL so API requests can be made
+    conditional: the caller gets a 304 with no body if nothing changed.
+    The validators from a 200 are only used once the caller has commit()ed
+    them, i.e. has finished using that data - otherwise a poll that failed
+    half way through would get a 304 next time for data it never used.
+    """
+    def __init__(self, pool_maxsize, retries, backoff):
+        retry = Retry(total=retries, backoff_factor=backoff,
+                      status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset(["GET"]),
+                      raise_on_status=False) # hand the last response back, callers check status_code
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.validators = {} # url -> (etag, last-modified)
+        self.staged = {} # url -> (etag, last-modified) from a 200 the caller hasn't commit()ed yet
+        self.validators_lock = threading.Lock()
+        self.not_modified = 0 # number of 304 responses
+
+    def get(self, url, headers=None, timeout=10):
+        return self.session.get(url, headers=headers, timeout=timeout)
+
+    def api_get(self, path, timeout=10, conditional=None):
+        """GET a TNNT API path (e.g. "/scoreboard/") with the API's default headers
+
+        With conditional=True, send If-None-Match/If-Modified-Since from the
+        last committed 200 response for this path. Callers must only ask for
+        this when they still hold the data from that response, and must handle
+        a 304. With conditional=False the request is plain, but the validators
+        are kept for commit(); leave it as None for paths that are never
+        conditional.
+        """
+        url = f"{TNNT_API_BASE}{path}"
+        headers = dict(TNNT_API_HEADERS)
+        if conditional:
+            with self.validators_lock:
+                etag, modified = self.validators.get(url, (None, None))
+            if etag:
+                headers["If-None-Match"] = etag
+            if modified:
+                headers["If-Modified-Since"] = modified
+        r = self.get(url, headers=headers, timeout=timeout)
+        if r.status_code == 200 and conditional is not None:
+            with self.validators_lock:
+                self.staged[url] = (r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        elif r.status_code == 304:
+            with self.validators_lock:
+                self.not_modified += 1
+        return r
+
+    def commit(self, path):
+        """The data from the last 200 for path has been used: make later requests for it conditional on that"""
+        url = f"{TNNT_API_BASE}{path}"
+        with self.validators_lock:
+            if url not in self.staged:
+                return # a 304, nothing new to remember
+            etag, modified = self.staged.pop(url)
+            if etag or modified:
+                self.validators[url] = (etag, modified)
+            else:
+                self.validators.pop(url, None)
+
+    def counters(self):
+        """Return (connections created, requests made) across all host pools"""
+        created = made = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                created += pool.num_connections
+                made += pool.num_requests
+        return created, made
+
+http_pool = HTTPPool(API_CONCURRENCY, HTTP_RETRIES, HTTP_BACKOFF)
+# returned in place of decoded data when the API answers 304 Not Modified
+API_NOT_MODIFIED = object()
+
+# LRU cache with expiry, for on-demand API lookups
+class TTLCache:
+    """LRU cache whose entries expire after ttl seconds.
+
+    Negative entries (value None, i.e. "doesn't exist") expire after the
+    shorter negative_ttl, so a typo can't hammer the API but a newly
+    registered player shows up soon enough.
+    """
+    def __init__(self, maxsize, ttl, negative_ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = OrderedDict() # key -> (expiry time, value)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Return (True, value) on a live hit, (False, None) otherwise"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if time.monotonic() >= expires:
+            del self.entries[key]
+            return False, None
+        self.entries.move_to_end(key)
+        return True, value
+
+    def put(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+# Ranked scoreboard view for $score/$clanscore
+class Leaderboard:
+    """Scoreboard entries in rank order, with a case-insensitive name -> rank index.
+
+    Built once per API poll so $score/$clanscore lookups don't have to sort
+    the whole scoreboard for every command.
+    """
+    def __init__(self, entries=None, key=None):
+        # ranked is a list of (name, data), best first
+        self.ranked = sorted((entries or {}).items(), key=key)
+        self.index = {}
+        for rank, (name, data) in enumerate(self.ranked, 1):
+            self.index.setdefault(name.lower(), rank)
+
+    def __len__(self):
+        return len(self.ranked)
+
+    def top(self, n):
+        """Return the first n (name, data) entries"""
+        return self.ranked[:n]
+
+    def find(self, name):
+        """Return (rank, name, data) for name (any case), or None"""
+        rank = self.index.get(name.lower())
+        if rank is None:
+            return None
+        found, data = self.ranked[rank - 1]
+        return rank, found, data
+
+# Lines waiting to go out to one IRC target
+class OutboundQueue:
+    """A deque of lines per priority (OUT_*) for one channel or nick.
+
+    Each entry is [message, award], where award is [player, kind, awards] for
+    an API trophy/achievement announcement, or None. While the queue is backed
+    up, a player's new awards are added to the entry already waiting for them
+    instead of queueing another line.
+    """
+    def __init__(self):
+        self.lines = [deque() for _ in range(OUT_PRIORITIES)]
+        self.awards = {} # (player, kind) -> waiting entry
+        self.depth = 0
+
+    def __len__(self):
+        return self.depth
+
+    def put(self, message, priority, award=None):
+        """Queue a line. Returns "queued", "merged" or "dropped" (this line or a less important one)."""
+        if award and self.depth >= OUTBOUND_MERGE_DEPTH:
+            entry = self.awards.get((award[0], award[1]))
+            if entry:
+                entry[1][2] = entry[1][2] + [a for a in award[2] if a not in entry[1][2]]
+                entry[0] = None # reformat when it's sent
+                return "merged"
+        result = "queued"
+        if self.depth >= OUTBOUND_MAX_QUEUE:
+            worst = max(p for p in range(OUT_PRIORITIES) if self.lines[p])
+            if priority >= worst:
+                return "dropped"
+            self._forget(self.lines[worst].pop())
+            self.depth -= 1
+            result = "dropped"
+        entry = [message, award and [award[0], award[1], list(award[2])]]
+        self.lines[priority].append(entry)
+        self.depth += 1
+        if award:
+            self.awards[(award[0], award[1])] = entry
+        return result
+
+    def peek(self):
+        """Priority of the next line to send, or None if there isn't one"""
+        for priority, lines in enumerate(self.lines):
+            if lines:
+                return priority
+        return None
+
+    def get(self):
+        """Take the next line: (message, award) - message None if award needs reformatting"""
+        entry = self.lines[self.peek()].popleft()
+        self.depth -= 1
+        self._forget(entry)
+        return entry
+
+    def _forget(self, entry):
+        award = entry[1]
+        if award and self.awards.get((award[0], award[1])) is entry:
+            del self.awards[(award[0], award[1])]
+
+# How quickly one slave answers queries
+class SlaveHealth:
+    """Response latency and missed queries for one slave.
+
+    The timeout is the smoothed latency plus four times its mean deviation,
+    as TCP does for retransmits, kept between QUERY_TIMEOUT_MIN and
+    QUERY_TIMEOUT. A slave that has missed SLAVE_DOWN_MISSES queries in a
+    row is down: it only gets a query every SLAVE_PROBE_INTERVAL seconds,
+    and nobody waits for it, until it answers one within QUERY_TIMEOUT.
+    """
+    def __init__(self):
+        self.latency = None # smoothed, seconds
+        self.deviation = 0.0
+        self.misses = 0 # in a row
+        self.probed = 0.0 # monotonic time we last queried it while down
+        self.histogram = [0] * (len(QUERY_LATENCY_BUCKETS) + 2) # buckets, slower, missed
+
+    @property
+    def down(self):
+        return self.misses >= SLAVE_DOWN_MISSES
+
+    def timeout(self):
+        if self.latency is None or self.down:
+            return QUERY_TIMEOUT
+        return min(QUERY_TIMEOUT, max(QUERY_TIMEOUT_MIN, self.latency + 4 * self.deviation))
+
+    def shouldQuery(self, now):
+        """False if the slave is down and was probed recently"""
+        if not self.down:
+            return True
+        if now - self.probed < SLAVE_PROBE_INTERVAL:
+            return False
+        self.probed = now
+        return True
 
-    When the shelve database fails to open, we fall back to an in-memory
-    dict. This class provides a no-op sync() method so the same code can
-    work with both shelve objects and the in-memory fallback.
+    def answered(self, latency):
+        if self.latency is None:
+            self.latency, self.deviation = latency, latency / 2
+        else:
+            self.deviation += QUERY_LATENCY_ALPHA * (abs(latency - self.latency) - self.deviation)
+            self.latency += QUERY_LATENCY_ALPHA * (latency - self.latency)
+        self.misses = 0
+        self.histogram[bisect.bisect_left(QUERY_LATENCY_BUCKETS, latency)] += 1
+
+    def missed(self):
+        self.misses += 1
+        self.histogram[-1] += 1
+
+    def describe(self):
+        """Histogram as "<=0.1s:12 <=0.25s:3 ... >5s:0 missed:1"""
+        labels = [f"<={b}s" for b in QUERY_LATENCY_BUCKETS] + [f">{QUERY_LATENCY_BUCKETS[-1]}s", "missed"]
+        return " ".join(f"{label}:{n}" for label, n in zip(labels, self.histogram))
+
+# Games in progress on this server, for $who/$whereis
+class LiveGames:
+    """Who's playing, from the dgamelaunch inprogress and whereis directories.
+
+    inprog and whereis are {variant: [directory, ...]}, as on the protocol.
+    Each game in progress is a PLAYER:date.ttyrec file in an inprogress dir;
+    each player's whereis file is PLAYER.whereis. Both are indexed by
+    lowercased name, so lookups don't have to go through the directories.
+    fileChanged() keeps them up to date from inotify; rescan() rebuilds
+    them from scratch. Whereis files are re-read when their mtime changes.
     """
-    def sync(self):
-        """No-op sync method for in-memory dict fallback."""
-        pass
+    def __init__(self, inprog, whereis):
+        self.inprog = inprog
+        self.whereisdirs = whereis
+        self.games = {} # inprogress path -> (variant, player)
+        self.playing = {} # lowercased player -> {inprogress path, ...}
+        self.whereis = {} # (variant, lowercased player) -> [path, mtime, record]
+
+    def _variant(self, dirs, path):
+        directory = os.path.dirname(path) + "/"
+        for var in dirs:
+            if directory in dirs[var]:
+                return var
+        return None
+
+    def _addGame(self, var, path):
+        player = os.path.basename(path).split(":")[0]
+        self.games[path] = (var, player)
+        self.playing.setdefault(player.lower(), set()).add(path)
+
+    def _removeGame(self, path):
+        var, player = self.games.pop(path)
+        paths = self.playing[player.lower()]
+        paths.discard(path)
+        if not paths:
+            del self.playing[player.lower()]
+
+    def rescan(self):
+        """Rebuild from the directories. Returns True if the games in progress changed."""
+        was = set(self.games)
+        self.games, self.playing = {}, {}
+        for var in self.inprog:
+            for inpdir in self.inprog[var]:
+                for inpfile in glob.iglob(inpdir + "*.ttyrec"):
+                    self._addGame(var, inpfile)
+        whereis = {}
+        for var in self.whereisdirs:
+            for widir in self.whereisdirs[var]:
+                for wipath in glob.iglob(widir + "*.whereis"):
+                    key = (var, os.path.basename(wipath)[:-len(".whereis")].lower())
+                    old = self.whereis.get(key)
+                    whereis[key] = old if old and old[0] == wipath else [wipath, None, None]
+        self.whereis = whereis
+        return set(self.games) != was
+
+    def fileChanged(self, path):
+        """A file was created or removed. Returns True if the games in progress changed."""
+        if path.endswith(".ttyrec"):
+            var = self._variant(self.inprog, path)
+            if var is None:
+                return False
+            if os.path.exists(path):
+                if path in self.games:
+                    return False
+                self._addGame(var, path)
+            elif path in self.games:
+                self._removeGame(path)
+            else:
+                return False
+            return True
+        if path.endswith(".whereis"):
+            var = self._variant(self.whereisdirs, path)
+            if var is not None:
+                key = (var, os.path.basename(path)[:-len(".whereis")].lower())
+                if os.path.exists(path):
+                    self.whereis[key] = [path, None, None]
+                else:
+                    self.whereis.pop(key, None)
+        return False
+
+    def players(self):
+        """Names of the players in each game in progress"""
+        return [player for var, player in self.games.values()]
+
+    def find(self, name):
+        """(player, whereis record or None) if name is playing, else None"""
+        paths = self.playing.get(name.lower())
+        if not paths:
+            return None
+        for path in paths:
+            var, player = self.games[path]
+            entry = self.whereis.get((var, name.lower()))
+            if entry is None:
+                continue
+            try:
+                mtime = os.stat(entry[0]).st_mtime_ns
+                if mtime != entry[1]:
+                    with open(entry[0], "rb") as f:
+                        entry[2] = parse_xlogfile_line(f.read(), ":")
+                    entry[1] = mtime
+            except OSError:
+                continue
+            # the whereis file has the name as they registered it
+            return os.path.basename(entry[0])[:-len(".whereis")], entry[2]
+        return self.games[next(iter(paths))][1], None
 
 # some lookup tables for formatting messages
 # these are not yet in conig.json
@@ -227,6 +805,80 @@ def sanitize_format_string(text):
         return text
     return text.replace('{', '{{').replace('}', '}}')
 
+def utf8_len(text):
+    return len(text.encode("utf-8"))
+
+def split_words(text, room):
+    """Break text into pieces of at most room bytes (UTF-8), between words
+    where possible, otherwise between characters.
+    """
+    pieces = []
+    piece = None
+    for word in text.split(" "):
+        if piece is not None and utf8_len(piece) + 1 + utf8_len(word) <= room:
+            piece += " " + word
+            continue
+        if piece is not None:
+            pieces.append(piece)
+        while utf8_len(word) > room: # nowhere to break it
+            cut = len(word.encode("utf-8")[:room].decode("utf-8", "ignore"))
+            pieces.append(word[:cut])
+            word = word[cut:]
+        piece = word
+    if piece:
+        pieces.append(piece)
+    return pieces
+
+def pack_lines(elements, sep, room, prefix=""):
+    """Join elements with sep into lines of at most room bytes (UTF-8, each
+    starting with prefix), breaking lines only between elements. An element
+    too long for a line of its own is broken up with split_words.
+    """
+    room -= utf8_len(prefix)
+    lines = []
+    line = None
+    for element in elements:
+        pieces = [element] if utf8_len(element) <= room else split_words(element, room)
+        for piece in pieces:
+            if line is not None and utf8_len(line) + utf8_len(sep) + utf8_len(piece) <= room:
+                line += sep + piece
+            else:
+                if line is not None:
+                    lines.append(prefix + line)
+                line = piece
+    if line is not None:
+        lines.append(prefix + line)
+    return lines
+
+def encode_frames(text, room):
+    """Encode a query response as #F# frame payloads of at most room bytes.
+    Returns (crc32 of the text, encoding, payloads). The encoding is
+    t: plain text, if it fits in one frame and has nothing IRC would eat
+    z: zlib compressed, base85
+    b: base85, when compressing doesn't help
+    """
+    data = text.encode("utf-8")
+    crc = zlib.crc32(data)
+    if len(data) <= room and text == text.strip() and not any(c in text for c in "\t\n\x0b\x0c\r\0"):
+        return crc, "t", [text]
+    packed = zlib.compress(data, 9)
+    if len(packed) < len(data):
+        encoding, payload = "z", base64.b85encode(packed).decode("ascii")
+    else:
+        encoding, payload = "b", base64.b85encode(data).decode("ascii")
+    return crc, encoding, [payload[i:i + room] for i in range(0, len(payload), room)]
+
+def decode_frames(encoding, payload):
+    """The text encode_frames made payload from. Raises ValueError (or zlib.error) if it's damaged"""
+    if encoding == "t":
+        return payload
+    if encoding not in ("z", "b"):
+        raise ValueError(f"unknown encoding {encoding}")
+    data = base64.b85decode(payload)
+    if encoding == "z":
+        data = zlib.decompress(data)
+    return data.decode("utf-8")
+
 def fromtimestamp_int(s):
     return datetime.fromtimestamp(int(s))
 
@@ -239,29 +891,343 @@ def isodate(s):
 def fixdump(s):
     return s.replace("_",":")
 
+# numeric xlogfile/livelog fields, and how to convert them.
 xlogfile_parse = dict.fromkeys(
     ("points", "deathdnum", "deathlev", "maxlvl", "hp", "maxhp", "deaths",
      "uid", "turns", "xplevel", "exp","depth","dnum","score","amulet"), int)
 xlogfile_parse.update(dict.fromkeys(
     ("conduct", "event", "carried", "flags", "achieve"), safe_int_parse))
+# the numeric fields the bot actually reads as numbers, converted at parse time.
+# everything else is left as a string - use xlogfile_parse[key] if you need the number.
+xlogfile_int_fields = ("points", "turns", "dnum", "depth", "amulet")
+# User-controlled fields that need sanitization
+xlogfile_user_fields = ("name", "charname", "death", "role", "race",
+                        "gender", "align", "bones_killed", "bones_rank",
+                        "killed_uniq", "wish", "shout", "genocided_monster",
+                        "shop", "shopkeeper")
 
 def parse_xlogfile_line(line, delim):
-    record = {}
-    # User-controlled fields that need sanitization
-    user_controlled_fields = {"name", "charname", "death", "role", "race",
-                             "gender", "align", "bones_killed", "bones_rank",
-                             "killed_uniq", "wish", "shout", "genocided_monster",
-                             "shop", "shopkeeper"}
-    for field in line.strip().decode(encoding='UTF-8', errors='ignore').split(delim):
-        key, _, value = field.partition("=")
-        if key in xlogfile_parse:
-            value = xlogfile_parse[key](value)
-        # Sanitize user-controlled fields to prevent format string injection
-        elif key in user_controlled_fields:
-            value = sanitize_format_string(value)
-        record[key] = value
+    """Parse one xlogfile/livelog/whereis line (bytes or memoryview) into a dict"""
+    text = str(line, "utf-8", "ignore").strip()
+    two_equals = RE_TWO_EQUALS.get(delim)
+    if two_equals is None:
+        two_equals = RE_TWO_EQUALS[delim] = re.compile("=[^" + re.escape(delim) + "]*=")
+    if text.count("=") == text.count(delim) + 1 and not two_equals.search(text):
+        # the usual case, exactly one "=" per field (as many as there are fields,
+        # and none with two): split on both at once and pair them up
+        fields = iter(text.replace("=", delim).split(delim))
+        record = dict(zip(fields, fields))
+    else:
+        record = dict(field.partition("=")[::2] for field in text.split(delim))
+    for key in xlogfile_int_fields:
+        if key in record:
+            record[key] = int(record[key])
+    # Sanitize user-controlled fields to prevent format string injection
+    for key in xlogfile_user_fields:
+        value = record.get(key)
+        if value and ("{" in value or "}" in value):
+            record[key] = sanitize_format_string(value)
     return record
 
+def map_log(f):
+    """mmap the whole of an open log file as it is now, or None if it's empty.
+    Call again to see anything written since.
+    """
+    size = os.fstat(f.fileno()).st_size
+    if not size:
+        return None
+    return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+
+def scan_lines(buf, start, end):
+    """Yield (line, offset just past it) for each complete line in buf[start:end].
+    Lines are memoryview slices of buf, without the newline - parse them, don't keep them.
+    """
+    view = memoryview(buf)
+    # for an mmap, hand back pages we're done with as we go, so a big
+    # xlogfile doesn't end up counting against our memory all at once
+    release = isinstance(buf, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED")
+    released = start - start % mmap.PAGESIZE
+    while True:
+        newline = buf.find(b"\n", start, end)
+        if newline < 0:
+            return
+        yield view[start:newline], newline + 1
+        start = newline + 1
+        if release and start - released >= MMAP_RELEASE_BYTES:
+            done = start - start % mmap.PAGESIZE
+            buf.madvise(mmap.MADV_DONTNEED, released, done - released)
+            released = done
+
+def new_stats():
+    """Empty stats for one period (hour/day/full)"""
+    return { "race"    : {},
+             "role"    : {},
+             "gender"  : {},
+             "align"   : {},
+             "points"  : 0,
+             "turns"   : 0,
+             "realtime": 0,
+             "games"   : 0,
+             "scum"    : 0,
+             "ascend"  : 0,
+           }
+
+def game_startscummed(game):
+    return game["death"].lower() in ["quit", "escaped"] and int(game["turns"]) <= 100
+
+def compact_stamp(s):
+    """An xlogfile timestamp as an int if it's a plain number - half the size of the string, and formats the same"""
+    return int(s) if s.isdigit() and s[0] != "0" else s
+
+def game_ref(game):
+    """What we keep of a game to rebuild its dumplog URL later:
+    (name, starttime, turns, death, dumpfmt), where turns and death are
+    only kept (for the message) if the game was startscummed.
+    """
+    if game_startscummed(game):
+        return (game["name"], compact_stamp(game["starttime"]), game["turns"], sys.intern(game["death"]), game["dumpfmt"])
+    return (game["name"], compact_stamp(game["starttime"]), 0, "", game["dumpfmt"])
+
+# role/race/gender/align code -> index into PlayerRecord.asc
+asc_codes = {}
+
+class PlayerRecord:
+    """Everything we remember from the xlogfile about one player.
+
+    games     : all games, even startscums
+    asc       : ascensions by role/race/gender/align, indexed by asc_codes, None until they ascend
+    lastgame  : game_ref of their last game, or None (kept unpacked, as there's one for everyone)
+    lastasc   : game_ref of their last ascension, or None
+    curstreak : (start, end, length) of the ascension streak they're on, or None
+    longstreak: (start, end, length) of their longest streak, or None
+    """
+    __slots__ = ("games", "asc", "name", "last_start", "last_turns", "last_death", "dumpfmt",
+                 "lastasc", "curstreak", "longstreak")
+
+    def __init__(self):
+        self.games = 0
+        self.asc = None
+        self.last_start = None
+        self.lastasc = None
+        self.curstreak = None
+        self.longstreak = None
+
+    @property
+    def lastgame(self):
+        if self.last_start is None:
+            return None
+        return (self.name, self.last_start, self.last_turns, self.last_death, self.dumpfmt)
+
+    @lastgame.setter
+    def lastgame(self, ref):
+        if ref is None:
+            self.last_start = None
+        else:
+            (self.name, self.last_start, self.last_turns, self.last_death, self.dumpfmt) = ref
+
+    def addAsc(self, code, count=1):
+        i = asc_codes.setdefault(code, len(asc_codes))
+        if self.asc is None:
+            self.asc = array.array("I")
+        if i >= len(self.asc):
+            self.asc.extend([0] * (len(asc_codes) - len(self.asc)))
+        self.asc[i] += count
+
+    def ascCounts(self):
+        """{code: ascensions}, or None if they've never ascended"""
+        if self.asc is None:
+            return None
+        return {code: self.asc[i] for code, i in asc_codes.items() if i < len(self.asc) and self.asc[i]}
+
+def add_stats(into, stats):
+    """Add one new_stats() worth of counts into another"""
+    for item in ["games", "scum", "turns", "points", "realtime", "ascend"]:
+        into[item] += stats[item]
+    for rrga in ["role", "race", "gender", "align"]:
+        for key, count in stats[rrga].items():
+            into[rrga][key] = into[rrga].get(key, 0) + count
+
+class GameStats:
+    """Stats for every game, in per-hour buckets (new_stats() dicts) by endtime.
+
+    The buckets are a ring of the last `hours` hours, each tagged with the hour
+    (endtime // SECONDS_PER_HOUR) it holds, so a bucket is reused once its hour
+    has dropped off the end. total has every game, however old.
+    Stats for a window are the sum of the buckets it covers.
+    """
+    def __init__(self, hours):
+        self.hours = hours
+        self.tags = [None] * hours
+        self.buckets = [None] * hours
+        self.total = new_stats()
+
+    def _bucket(self, hour):
+        """The bucket for hour, or None if the ring has moved past it"""
+        i = hour % self.hours
+        tag = self.tags[i]
+        if tag != hour:
+            if tag is not None and tag > hour:
+                return None
+            self.tags[i] = hour
+            self.buckets[i] = new_stats()
+        return self.buckets[i]
+
+    def addGame(self, game, is_startscum):
+        # look everything up first, so a bad line doesn't count in some windows and not others
+        turns, points, realtime = int(game["turns"]), int(game["points"]), int(game["realtime"])
+        rrgas = [] if is_startscum else [(rrga, game[rrga]) for rrga in ["role","race","gender","align"]]
+        bucket = self._bucket(int(game["endtime"]) // SECONDS_PER_HOUR)
+        for stats in (self.total, bucket):
+            if stats is None: continue
+            stats["games"] += 1
+            if is_startscum:
+                stats["scum"] += 1
+            for rrga, value in rrgas: # only count non-scums in rrga stats
+                stats[rrga][value] = stats[rrga].get(value,0) + 1
+            stats["turns"] += turns
+            stats["points"] += points
+            stats["realtime"] += realtime
+            if game["death"] == "ascended":
+                stats["ascend"] += 1
+
+    def window(self, start=None, end=None):
+        """new_stats() for games that ended in the hours from start up to end
+        (timestamps, None for no limit). An hour counts if any of it is in the window.
+        """
+        stats = new_stats()
+        if start is None and end is None:
+            add_stats(stats, self.total)
+            return stats
+        first = -1 if start is None else int(start) // SECONDS_PER_HOUR
+        last = None if end is None else -(-int(end) // SECONDS_PER_HOUR)
+        for tag, bucket in sorted((tag, bucket) for tag, bucket in zip(self.tags, self.buckets)
+                                  if tag is not None and tag >= first and (last is None or tag < last)):
+            add_stats(stats, bucket)
+        return stats
+
+    def saveState(self):
+        """JSON-able copy, for the xlogfile checkpoint and for worker processes to send back"""
+        return {"buckets": sorted([tag, bucket] for tag, bucket in zip(self.tags, self.buckets) if tag is not None),
+                "total"  : self.total}
+
+    def merge(self, state):
+        """Add the games from another GameStats' saveState()"""
+        for hour, stats in state["buckets"]:
+            bucket = self._bucket(hour)
+            if bucket is not None:
+                add_stats(bucket, stats)
+        add_stats(self.total, state["total"])
+
+def stats_window(period, nowtime):
+    """(start, end, description) of the endtimes a $stats period covers,
+    end None if it runs up to now. Returns None if we don't know the period.
+    """
+    hour = nowtime.replace(minute=0, second=0, microsecond=0)
+    day = hour.replace(hour=0)
+    if period == "today":
+        return (day.timestamp(), None, "today")
+    if period == "yesterday":
+        return ((day - timedelta(days=1)).timestamp(), day.timestamp(), "yesterday")
+    if period == "hour":
+        return (hour.timestamp(), None, "this hour")
+    if period == "lasthour":
+        return ((hour - timedelta(hours=1)).timestamp(), hour.timestamp(), "the last hour")
+    if period in ("all", "full"):
+        return (None, None, "the whole tournament")
+    match = RE_STATS_PERIOD.match(period)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        if 0 < count <= STATS_MAX_PERIOD[unit]:
+            length = timedelta(hours=count) if unit == "h" else timedelta(days=count)
+            return ((nowtime - length).timestamp(), None,
+                    f"the last {count} {'hour' if unit == 'h' else 'day'}{'s' if count > 1 else ''}")
+    return None
+
+def ingest_xlog_chunk(path, start, end, delim, variant, dumpfmt, file_prefix, stats_hours):
+    """Replay bytes [start, end) of an xlogfile the way xlogfileReport(game, False) does,
+    into partial aggregates that DeathBotProtocol._mergeXlogChunk applies in file order.
+
+    Anything that depends on earlier games is kept as a fragment:
+    lg/la keep the game_ref of the last game, streaks keep [starts with an ascension, ends with an ascension, runs of
+    (start, end, length)] and shortgame keeps [had a long game, trailing short games].
+    Runs in a worker process, so only module-level names here.
+    """
+    part = { "lines"    : 0,
+             "allgames" : {},
+             "gamestats": None,
+             "asc"      : {},
+             "lg"       : {},
+             "la"       : {},
+             "lastgame" : None,
+             "lastasc"  : None,
+             "streaks"  : {},
+             "shortgame": {} }
+    allgames, asc, lg, la = part["allgames"], part["asc"], part["lg"], part["la"]
+    gamestats = GameStats(stats_hours)
+    streaks, shortgame = part["streaks"], part["shortgame"]
+    with open(path, "rb") as f:
+        logmap = map_log(f)
+    if logmap is None:
+        raise OSError(f"{path} is empty")
+    try:
+        for line, next_offset in scan_lines(logmap, start, end):
+            # release each line as we go, or the map can't be closed
+            with line:
+                part["lines"] += 1
+                # same steps in the same order as xlogfileReport, so a bad line stops at the same place
+                try:
+                    game = parse_xlogfile_line(line, delim)
+                    game["variant"] = variant
+                    game["dumpfmt"] = dumpfmt
+                    lname = game["name"].lower()
+                    allgames[lname] = allgames.get(lname, 0) + 1
+                    gamestats.addGame(game, game_startscummed(game))
+
+                    (file_prefix + game["dumpfmt"]).format(**game)
+                    ref = game_ref(game)
+                    lg[lname] = ref
+                    part["lastgame"] = ref
+
+                    streak = streaks.get(lname)
+                    if game["death"][0:8] in ("ascended"):
+                        la[lname] = ref
+                        part["lastasc"] = ref
+                        if not lname in asc: asc[lname] = {}
+                        for rrga in ["role","race","gender","align"]:
+                            asc[lname][game[rrga]] = asc[lname].get(game[rrga], 0) + 1
+                        if streak is None:
+                            streak = streaks[lname] = [True, False, []]
+                        if streak[1]:
+                            (cs_start, cs_end, cs_length) = streak[2][-1]
+                            streak[2][-1] = (cs_start, compact_stamp(game["endtime"]), cs_length + 1)
+                        else:
+                            streak[2].append((compact_stamp(game["starttime"]), compact_stamp(game["endtime"]), 1))
+                            streak[1] = True
+                    elif streak is None:
+                        streaks[lname] = [False, False, []]
+                    else:
+                        streak[1] = False
+
+                    if game["turns"] < SHORT_GAME_TURNS:
+                        shortgame.setdefault(game["name"], [False, 0])[1] += 1
+                    else:
+                        shortgame[game["name"]] = [True, 0]
+                except Exception:
+                    continue
+    finally:
+        logmap.close()
+    part["gamestats"] = gamestats.saveState()
+    return part
+
+def ingest_xlog_worker(conn, *args):
+    """Process entry point: send ingest_xlog_chunk's result (or the exception) back down conn"""
+    try:
+        conn.send(ingest_xlog_chunk(*args))
+    except Exception as e:
+        conn.send(e)
+    finally:
+        conn.close()
+
 class DeathBotProtocol(irc.IRCClient):
     nickname = NICK
     username = USERNAME
@@ -387,27 +1353,13 @@ class DeathBotProtocol(irc.IRCClient):
                 "The Elemental Planes"]
 
     looping_calls = None
+    out_drain = None  # DelayedCall for the next _drainOutbound
     commands = {}
 
-    def initStats(self, statset):
-        self.stats[statset] = { "race"    : {},
-                                "role"    : {},
-                                "gender"  : {},
-                                "align"   : {},
-                                "points"  : 0,
-                                "turns"   : 0,
-                                "realtime": 0,
-                                "games"   : 0,
-                                "scum"    : 0,
-                                "ascend"  : 0,
-                              }
-
     def _initializeStats(self):
-        """Initialize statistics tracking for hourly/daily/full periods."""
-        self.stats = {}
-        self.initStats("hour")
-        self.initStats("day")
-        self.initStats("full")
+        """Initialize the hourly stats buckets, enough for the tournament and grace period."""
+        hours = int((self.ttime["end"] - self.ttime["start"]).total_seconds()) // SECONDS_PER_HOUR + GRACEDAYS * 24
+        self.gamestats = GameStats(hours)
 
     def _scheduleMasterTasks(self):
         """Schedule master-specific periodic tasks."""
@@ -423,6 +1375,8 @@ class DeathBotProtocol(irc.IRCClient):
 
     def _scheduleAPIPolling(self):
         """Schedule API polling to run every 5 minutes at :00:30, :05:30, :10:30, :15:30, etc."""
+        # per-player fetches run in the reactor's thread pool, make sure it can hold them all
+        reactor.suggestThreadPoolSize(max(API_CONCURRENCY, 10))
         # Do an initial fetch after 30 seconds to populate data quickly
         reactor.callLater(30, self._initialAPIFetch)
 
@@ -474,42 +1428,35 @@ class DeathBotProtocol(irc.IRCClient):
                             "realtime": [50, 100, 500, 1000, 5000 ], # converted to 24h days (86400s)
                             "ascend"  : [50, 100, 200, 300, 400, 500]}
 
+    tellstore = None  # TellStore, once we've signed on
+
     def _initializeGameTracking(self):
         """Initialize game tracking data structures."""
-        # lastgame tracking
-        self.lastgame = "No last game recorded"
-        self.lg = {}
-        self.lastasc = "No last ascension recorded"
-        self.la = {}
-
-        # streaks
-        self.curstreak = {}
-        self.longstreak = {}
-
-        # ascensions (for !asc)
-        # "!asc plr" will give asc stats for player.
-        # "!asc" will be as above, assuming requestor's nick.
-        # asc[player][role] = count;
-        # asc[player][race] = count;
-        # asc[player][align] = count;
-        # asc[player][gender] = count;
-        # assumes 3-char abbreviations for role/race/align/gender, and no overlaps.
-        # for asc ratio we need total games too
-        # allgames[player] = count;
-        self.asc = {}
-        self.allgames = {}
+        # per-player game count, ascensions (for !asc), last game/ascension
+        # and streaks, keyed by lowercased name - see PlayerRecord.
+        # asc counts assume 3-char abbreviations for role/race/align/gender, and no overlaps.
+        self.players = {}
+        # game_ref of the last game/ascension on this server, for !lastgame/!lastasc
+        self.lastgame = None
+        self.lastasc = None
 
         # for !tell
         try:
-            self.tellbuf = shelve.open(f"{BOTDIR}/tellmsg.db", writeback=True)
+            self.tellstore = TellStore(TELLDB)
         except Exception as e:
-            # Fallback to older format if .db fails
-            try:
-                self.tellbuf = shelve.open(f"{BOTDIR}/tellmsg", writeback=True, protocol=2)
-            except Exception as e2:
-                tlog(f"Error: Could not open tell message database: {e2}")
-                # Create an in-memory fallback so bot doesn't crash
-                self.tellbuf = DictWithSync()
+            tlog(f"Error: Could not open tell message database: {e}")
+            # Create an in-memory fallback so bot doesn't crash
+            self.tellstore = TellStore(":memory:")
+            return
+        try:
+            # first run since we used shelve: bring the old messages over
+            # (it's tellmsg if the .db one wouldn't open)
+            count = self.tellstore.migrate([f"{BOTDIR}/tellmsg.db", f"{BOTDIR}/tellmsg"])
+            if count:
+                tlog(f"Moved {count} $tell messages to {TELLDB}")
+        except Exception as e:
+            # keep the database we have, the old messages can come over next time
+            tlog(f"Error: Could not move the old $tell messages to {TELLDB}: {e}")
 
     def _initializeGitHub(self):
         """Initialize GitHub monitoring data structures."""
@@ -532,7 +1479,19 @@ class DeathBotProtocol(irc.IRCClient):
         self.clan_rankings = {}  # clan -> rank position
         self.player_scores = {}  # player -> {wins, total_games, ratio}
         self.clan_scores = {}  # clan -> {wins, total_games, ratio}
+        self.player_board = Leaderboard()  # ranked view of player_scores, rebuilt every poll
+        self.lookup_cache = TTLCache(LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL, LOOKUP_NEGATIVE_TTL)
+        self.lookups_inflight = {}  # cache key -> [Deferred, ...] waiting on the same fetch
+        self.clan_board = Leaderboard()  # ranked view of clan_scores
         self.recently_cleared_players = set()  # Players cleared due to database wipe
+        self.api_poll_running = False  # True while a poll is in flight in a worker thread
+        self.api_retry_players = set()  # players whose last fetch failed, refetch next poll
+        self.api_sweep_pos = 0  # round-robin position for refetching unchanged players
+        self.api_feed_cursor = None  # position in the bulk award feed, None = fetch everything
+        self.api_feed_supported = None  # None = don't know yet, False = API has no bulk feed
+        self.api_feed_checked = 0  # when we last found out the API has no bulk feed
+        if not SLAVE:
+            self._loadAPIState()
 
     def _initializeRateLimiting(self):
         """Initialize rate limiting data structures."""
@@ -541,6 +1500,7 @@ class DeathBotProtocol(irc.IRCClient):
         self.consecutive_commands = {}  # user -> [command_time, command_time, ...]
         self.penalty_responses = {}  # user -> [timestamp, timestamp, ...]
         self.last_command_time = {}  # user -> timestamp of last command
+        self.reactor_lag_max = 0.0  # worst reactor stall seen by _probeReactorLag
 
     def _initializeCommands(self):
         """Initialize command handlers and callbacks."""
@@ -577,7 +1537,10 @@ class DeathBotProtocol(irc.IRCClient):
                          "#q#"      : self.doQuery,
                          # responses from slave to master
                          "#p#"      : self.doResponse, # 'partial' for long responses
-                         "#r#"      : self.doResponse}
+                         "#r#"      : self.doResponse,
+                         "#f#"      : self.doFrame, # framed response, in any order
+                         # slave's answers have changed since it last answered us
+                         "#i#"      : self.doInvalidate}
         # commands executed based on contents of #Q# message
         self.qCommands = {"players" : self.getPlayers,
                           "who"     : self.getPlayers,
@@ -608,11 +1571,27 @@ class DeathBotProtocol(irc.IRCClient):
                           "dstats"  : self.outStats,
                           "fstats"  : self.outStats}
 
+        # queries we can answer before every slave has responded
+        self.queryDone = {"whereis" : self.foundWhereIs}
+
+        # response times for each slave, for query timeouts
+        self.slave_health = {sl: SlaveHealth() for sl in self.slaves}
+
+        # master: slave answers we can reuse (see QUERY_CACHE), and for each slave that
+        # sends #I#, how many times each kind of answer has gone stale
+        self.query_cache = TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL, QUERY_CACHE_TTL)
+        self.query_cache_counts = {"hits": 0, "misses": 0}
+        self.slave_gens = {} # slave -> {kind: generation}
+        # slave: masters that want #I#, with the last query id number they sent
+        # and what we've told them since
+        self.invalidate_to = {} # master -> [number, set of kinds]
+
         # checkUsage outputs a message and returns false if input is bad
         # returns true if input is ok
         self.checkUsage ={"whereis" : self.usageWhereIs,
                           "asc"     : self.usageAsc,
-                          "streak"  : self.usageStreak}
+                          "streak"  : self.usageStreak,
+                          "stats"   : self.usageStats}
 
     def _initializeLogReading(self):
         """Initialize log file reading and seek to appropriate positions."""
@@ -626,32 +1605,164 @@ class DeathBotProtocol(irc.IRCClient):
                 tlog(f"Warning: Could not seek to end of livelog {filepath}: {e}")
                 self.logs_seek[filepath] = 0
 
-        # sequentially read xlogfiles from beginning to pre-populate lastgame data.
+        # sequentially read xlogfiles to pre-populate lastgame data - from the
+        # last checkpoint if it still matches the files, otherwise from the beginning.
+        offsets = self._loadCheckpoint() or {}
         for filepath in self.xlogfiles:
+            offset = offsets.get(filepath.path, 0)
+            # a lot to read (cold start on a big file) - spread it over several processes.
+            # Only on the first connection - see DeathBotFactory.bulk_ingested.
+            try:
+                if (not self.factory.bulk_ingested and XLOG_BULK_WORKERS > 1
+                        and filepath.getsize() - offset >= XLOG_BULK_MIN_SIZE):
+                    offset = self._bulkIngestXlog(filepath, offset)
+            except (IOError, OSError):
+                pass # the sequential read below will complain
             try:
                 with filepath.open("r") as handle:
-                    for line in handle:
-                        try:
-                            delim = self.logs[filepath][2]
-                            game = parse_xlogfile_line(line, delim)
-                            game["variant"] = self.logs[filepath][1]
-                            game["dumpfmt"] = self.logs[filepath][3]
-                            for line in self.logs[filepath][0](game,False):
-                                pass
-                        except Exception as e:
-                            tlog("Warning: Error processing xlogfile line during startup: {e}")
-                            continue
-                    self.logs_seek[filepath] = handle.tell()
+                    logmap = map_log(handle)
+                started, lines = time.monotonic(), 0
+                if logmap:
+                    try:
+                        # a half-written last line is left for the tailer to pick up
+                        for line, offset in scan_lines(logmap, offset, len(logmap)):
+                            lines += 1
+                            # release each line as we go, or the map can't be closed
+                            with line:
+                                try:
+                                    delim = self.logs[filepath][2]
+                                    game = parse_xlogfile_line(line, delim)
+                                    game["variant"] = self.logs[filepath][1]
+                                    game["dumpfmt"] = self.logs[filepath][3]
+                                    for line in self.logs[filepath][0](game,False):
+                                        pass
+                                except Exception as e:
+                                    tlog(f"Warning: Error processing xlogfile line during startup: {e}")
+                                    continue
+                    finally:
+                        logmap.close()
+                self.logs_seek[filepath] = offset
+                tlog(f"Read {lines} lines of {filepath.path} in {time.monotonic() - started:.2f}s")
             except (IOError, OSError) as e:
                 tlog(f"Warning: Could not read xlogfile {filepath}: {e}")
                 self.logs_seek[filepath] = 0
+        self.factory.bulk_ingested = True
+
+    def _bulkIngestXlog(self, filepath, offset):
+        """Replay an xlogfile from offset to its last complete line in XLOG_BULK_WORKERS processes.
+
+        The file is split into newline-aligned byte ranges, each replayed by
+        ingest_xlog_chunk in its own process, and the partial results are merged
+        in file order, which gives the same result as reading it line by line.
+        Returns the offset to carry on from - the original one if it didn't work.
+        """
+        started = time.monotonic()
+        variant, delim, dumpfmt = self.xlogfiles[filepath]
+        with filepath.open("r") as handle:
+            logmap = map_log(handle)
+        if logmap is None:
+            return offset
+        try:
+            # stop at the end of the last complete line
+            end = logmap.rfind(b"\n", offset) + 1
+            if end <= offset:
+                return offset
+            bounds = [offset]
+            for i in range(1, XLOG_BULK_WORKERS):
+                split = logmap.find(b"\n", offset + (end - offset) * i // XLOG_BULK_WORKERS, end) + 1
+                bounds.append(max(split, bounds[-1]))
+            bounds.append(end)
+        finally:
+            logmap.close()
+
+        # fork, so the workers don't need to import this file (which twistd runs rather than imports)
+        context = multiprocessing.get_context("fork")
+        workers = []
+        try:
+            for start, stop in zip(bounds, bounds[1:]):
+                if start == stop: continue
+                conn, child_conn = context.Pipe(duplex=False)
+                proc = context.Process(target=ingest_xlog_worker, daemon=True,
+                                       args=(child_conn, filepath.path, start, stop, delim, variant,
+                                             dumpfmt, self.dump_file_prefix, self.gamestats.hours))
+                proc.start()
+                child_conn.close()
+                workers.append((proc, conn))
+            deadline = time.monotonic() + XLOG_BULK_TIMEOUT
+            parts = []
+            for proc, conn in workers:
+                if not conn.poll(max(0, deadline - time.monotonic())):
+                    raise TimeoutError(f"no result after {XLOG_BULK_TIMEOUT}s")
+                parts.append(conn.recv())
+        except Exception as e:
+            tlog(f"Warning: Parallel read of {filepath.path} failed ({e}), reading it line by line")
+            return offset
+        finally:
+            for proc, conn in workers:
+                conn.close()
+                if proc.is_alive(): proc.terminate()
+                proc.join()
+        for part in parts:
+            if isinstance(part, Exception):
+                tlog(f"Warning: Parallel read of {filepath.path} failed ({part}), reading it line by line")
+                return offset
+
+        for part in parts:
+            self._mergeXlogChunk(part)
+        tlog(f"Read {sum(part['lines'] for part in parts)} lines of {filepath.path} "
+             f"in {len(workers)} processes in {time.monotonic() - started:.2f}s")
+        return end
+
+    def _mergeXlogChunk(self, part):
+        """Apply one ingest_xlog_chunk result on top of what we have so far"""
+        players = self.players
+        for lname, count in part["allgames"].items():
+            player = players.get(lname)
+            if player is None:
+                player = players[lname] = PlayerRecord()
+            player.games += count
+        self.gamestats.merge(part["gamestats"])
+        for lname, counts in part["asc"].items():
+            player = players[lname]
+            for code, count in counts.items():
+                player.addAsc(code, count)
+        for lname, ref in part["lg"].items():
+            players[lname].lastgame = ref
+        for lname, ref in part["la"].items():
+            players[lname].lastasc = ref
+        self.lastgame = part["lastgame"] or self.lastgame
+        self.lastasc = part["lastasc"] or self.lastasc
+
+        # replay each player's ascension runs in order, continuing any streak
+        # they were already on if the chunk starts with an ascension
+        for lname, (head_open, tail_open, runs) in part["streaks"].items():
+            player = players[lname]
+            cur = player.curstreak
+            for i, (cs_start, cs_end, cs_length) in enumerate(runs):
+                if i == 0 and head_open and cur:
+                    cs_start, cs_length = cur[0], cur[2] + cs_length
+                run = (cs_start, cs_end, cs_length)
+                (ls_start, ls_end, ls_length) = player.longstreak or (0,0,0)
+                if cs_length > ls_length:
+                    player.longstreak = run
+            player.curstreak = run if tail_open else None
+
+        for name, (had_long, trailing) in part["shortgame"].items():
+            if not had_long:
+                trailing += self.shortgame.get(name, 0)
+            if trailing:
+                self.shortgame[name] = trailing
+            elif name in self.shortgame:
+                del self.shortgame[name]
 
     def _startMonitoringTasks(self):
         """Start periodic monitoring tasks."""
-        # poll logs for updates
-        for filepath in self.logs:
-            self.looping_calls[filepath] = task.LoopingCall(self.logReport, filepath)
-            self.looping_calls[filepath].start(LOG_POLL_INTERVAL)
+        # tail logs for updates - inotify tells us as soon as they change,
+        # otherwise poll them
+        if not self._watchLogs():
+            for filepath in self.logs:
+                self.looping_calls[filepath] = task.LoopingCall(self.logReport, filepath)
+                self.looping_calls[filepath].start(LOG_POLL_INTERVAL)
 
         # Additionally, keep an eye on our nick to make sure it's right.
         # Perhaps we only need to set this up if the nick was originally
@@ -666,9 +1777,30 @@ class DeathBotProtocol(irc.IRCClient):
         # Schedule TNNT API polling for every 5 minutes at :00:30, :05:30, :10:30, :15:30, etc.
         if not SLAVE:
             self._scheduleAPIPolling()
+        # Keep track of games in progress for $who/$whereis - inotify tells us
+        # about them as they start and end, otherwise rescan the directories.
+        # Either way, a rescan now and then in case we missed something.
+        self.live_games = LiveGames(self.inprog, self.whereis)
+        self.live_games.rescan()
+        rescan = LIVE_GAMES_RESCAN if self._watchGames() else LOG_POLL_INTERVAL
+        self.looping_calls["games"] = task.LoopingCall(self._rescanGames)
+        self.looping_calls["games"].start(rescan, now=False)
         # Update local milestone summary to master every 5 minutes
         self.looping_calls["summary"] = task.LoopingCall(self.updateSummary)
         self.looping_calls["summary"].start(SUMMARY_UPDATE_INTERVAL)
+        # Checkpoint the xlogfile aggregates so a restart only has to read new games
+        self.looping_calls["checkpoint"] = task.LoopingCall(self._saveCheckpoint)
+        self.looping_calls["checkpoint"].start(CHECKPOINT_INTERVAL, now=False)
+        # Watch for anything blocking the reactor (slow file or network I/O)
+        if REACTOR_LAG_PROBE:
+            self.lag_probe_last = time.monotonic()
+            self.looping_calls["lag"] = task.LoopingCall(self._probeReactorLag)
+            self.looping_calls["lag"].start(REACTOR_LAG_INTERVAL, now=False)
+
+    def _rescanGames(self):
+        if self.live_games.rescan():
+            # tell masters caching our $who/$whereis answers
+            self._pushInvalidation("inprog")
 
     # SASL auth nonsense required if we run on AWS
     # copied from https://github.com/habnabit/txsocksx/blob/master/examples/tor-irc.py
@@ -717,9 +1849,14 @@ class DeathBotProtocol(irc.IRCClient):
             self.logs[livelog] = (self.livelogReport, variant, delim, "", True)
 
         self.logs_seek = {}
+        self.log_handles = {}  # filepath -> file kept open for tailing
+        self.log_watch = {}  # (directory, basename) -> filepath, for inotify events
+        self.notifier = None  # inotify.INotify, if we have it
+        self.checkpoint_files = None  # xlogfile positions in the last checkpoint we wrote
         self.looping_calls = {}
 
     def signedOn(self):
+        self._initializeOutbound()
         self._initializeConnection()
         self._initializeLogs()
 
@@ -784,6 +1921,76 @@ class DeathBotProtocol(irc.IRCClient):
             self.log(replyto, f"<{self.nickname}> {message}")
         self.msg(replyto, message)
 
+    def _initializeOutbound(self):
+        """Set up the outbound line queues and the token bucket that paces them."""
+        self.outqueues = {}  # target -> OutboundQueue, only while it has lines waiting
+        self.out_tokens = OUTBOUND_BURST
+        self.out_refilled = time.monotonic()
+        self.out_counts = {"sent": 0, "merged": 0, "dropped": 0}
+        self.out_maxdepth = 0
+
+    # paced, prioritised msgLog. Everything we announce goes through here, so a
+    # burst of announcements can't get us kicked for flooding.
+    # Lines too long for one PRIVMSG are split between words here, rather than
+    # by twisted (by characters, not bytes, and all sent at once).
+    def queueMsg(self, target, message, priority = OUT_URGENT, award = None):
+        lines = [message]
+        if award is None:
+            room = self.lineRoom(target)
+            lines = [piece for part in message.split("\n") if part
+                     for piece in ([part] if utf8_len(part) <= room else split_words(part, room))]
+            if not lines:
+                return
+        queue = self.outqueues.get(target)
+        if queue is None:
+            queue = self.outqueues[target] = OutboundQueue()
+        for line in lines:
+            result = queue.put(line, priority, award)
+            if result != "queued":
+                self.out_counts[result] += 1
+        self.out_maxdepth = max(self.out_maxdepth, sum(len(q) for q in self.outqueues.values()))
+        self._drainOutbound()
+
+    def _drainOutbound(self):
+        """Send queued lines while the token bucket allows, the most important first,
+        taking turns between targets. Schedules itself again if anything is left.
+        """
+        now = time.monotonic()
+        self.out_tokens = min(OUTBOUND_BURST, self.out_tokens + (now - self.out_refilled) * OUTBOUND_RATE)
+        self.out_refilled = now
+        # an empty queue has nothing to compare on, and nothing to send
+        for target in [t for t, queue in self.outqueues.items() if not queue]:
+            del self.outqueues[target]
+        while self.out_tokens >= 1 and self.outqueues:
+            # dict order is the order targets were last served in
+            target = min(self.outqueues, key=lambda t: self.outqueues[t].peek())
+            queue = self.outqueues.pop(target)
+            message, award = queue.get()
+            if queue:
+                self.outqueues[target] = queue
+            if message is None:
+                message = self._formatAwards(*award)
+            self.out_tokens -= 1
+            self.out_counts["sent"] += 1
+            self.msgLog(target, message)
+        if self.outqueues and not (self.out_drain and self.out_drain.active()):
+            self.out_drain = reactor.callLater((1 - self.out_tokens) / OUTBOUND_RATE, self._drainOutbound)
+
+    def lineRoom(self, target):
+        """Bytes of text that are sure to fit in one PRIVMSG to target, once the
+        server has put our nick!user@host on the front.
+        """
+        fmt = f"PRIVMSG {target} :"
+        return self._safeMaximumLineLength(fmt) - utf8_len(fmt) - 2
+
+    def _announcePriority(self, line, spam):
+        """OUT_* priority for a game announcement: spam ones are livelog events"""
+        if spam:
+            return OUT_ACHIEVEMENT
+        if (self.displaytag("ascended") + ":") in line:
+            return OUT_ASCENSION
+        return OUT_DEATH
+
     # Similar wrapper for describe
     def describeLog(self,replyto, message):
         if replyto in CHANNELS:
@@ -793,7 +2000,8 @@ class DeathBotProtocol(irc.IRCClient):
     # Tournament announcements typically go to the channel
     # ...and to the channel log
     # spam flag allows more verbosity in some channels
-    def announce(self, message, spam = False, strict_tournament_time = False, early_start_hours = 0):
+    def announce(self, message, spam = False, strict_tournament_time = False, early_start_hours = 0,
+                 priority = OUT_URGENT, award = None):
         if not TEST:
             # Check if we should announce based on tournament timing
             nowtime = datetime.now()
@@ -814,17 +2022,24 @@ class DeathBotProtocol(irc.IRCClient):
         if spam:
             chanlist = SPAMCHANNELS #only
         for c in chanlist:
-            self.msgLog(c, message)
+            self.queueMsg(c, message, priority, award)
 
     # construct and send response.
     # replyto is channel, or private nick
     # sender is original sender of query
     def respond(self, replyto, sender, message):
+        self.respondList(replyto, sender, [message])
+
+    # respond with a list of things (e.g. one per server), packed into as few
+    # lines as will fit without splitting any of them
+    def respondList(self, replyto, sender, elements, sep = " | "):
         try:
             if (replyto.lower() == sender.lower()): #private
-                self.msg(replyto, message)
-            else: #channel - prepend "Nick: " to message
-                self.msgLog(replyto, sender + ": " + message)
+                prefix = ""
+            else: #channel - prepend "Nick: " to each line
+                prefix = sender + ": "
+            for line in pack_lines(elements, sep, self.lineRoom(replyto), prefix):
+                self.queueMsg(replyto, line)
         except Exception as e:
             tlog(f"Error sending response to {replyto}: {e}")
 
@@ -947,6 +2162,22 @@ class DeathBotProtocol(irc.IRCClient):
             tlog(f"Burst protection error for {sender}: {e}")
             return True  # Fail-safe: allow command
 
+    def dumplogURL(self, game, is_startscum):
+        """The dumplog URL we report for a game (or why there isn't one)"""
+        # Need to figure out the dump path before messing with the name
+        dumpfile = (self.dump_file_prefix + game["dumpfmt"]).format(**game)
+
+        # Check if game was startscummed - those don't produce dumplogs
+        if is_startscum:
+            return f"Game was startscummed ({game['turns']} turns, {game['death']}) - no dumplog exists"
+        # Generate dumplog URL using new method that checks both local and S3
+        if TEST:
+            # In test mode, always generate a URL
+            dumpurl = urllib.parse.quote(game["dumpfmt"].format(**game))
+            return self.dump_url_prefix.format(**game) + dumpurl
+        # In production, use the new method that checks both local and S3
+        return self.generate_dumplog_url(game, dumpfile)
+
     def generate_dumplog_url(self, game, dumpfile):
         """Generate dumplog URL, checking local storage first, then S3.
 
@@ -1062,40 +2293,162 @@ class DeathBotProtocol(irc.IRCClient):
         # called when slave gets queried by master.
         # msgwords is [ #Q#, <query_id>, <orig_sender>, <command>, ... ]
         if (sender in MASTERS) and (msgwords[3] in self.qCommands):
+            self._subscribeInvalidation(sender, msgwords[1])
             # sender is passed to master; msgwords[2] is passed tp sender
             self.qCommands[msgwords[3]](sender,msgwords[2],msgwords[1],msgwords[3:])
         else:
             tlog(f"Bogus slave query from {sender}: {' '.join(msgwords)}")
 
+    def _subscribeInvalidation(self, master, query):
+        # a master that caches our answers has asked us something: anything we
+        # push from now on is news to it
+        caps = query.lstrip("0123456789")
+        if INVALIDATE_QUERY not in caps or caps == query: return
+        number = int(query[:len(query) - len(caps)])
+        told = self.invalidate_to.get(master)
+        if told is None or number <= told[0]:
+            # new to us, or restarted: forget whatever it had from us before
+            self.queueMsg(master, "#I# all")
+        self.invalidate_to[master] = [number, set()]
+
+    def _pushInvalidation(self, kind):
+        # tell masters our answers from kind (QUERY_CACHE_KINDS) have changed.
+        # Once per kind is enough until they ask again.
+        for master, told in self.invalidate_to.items():
+            if kind not in told[1]:
+                told[1].add(kind)
+                self.queueMsg(master, f"#I# {kind}")
+
+    #I#
+    def doInvalidate(self, sender, replyto, msgwords):
+        # called when a slave's answers have changed
+        # msgwords is [ #I#, <kind>|all, ... ]
+        if sender not in self.slaves:
+            tlog(f"Bogus slave invalidation from {sender}: {' '.join(msgwords)}")
+            return
+        gens = self.slave_gens.setdefault(sender, dict.fromkeys(QUERY_CACHE_KINDS, 0))
+        for kind in msgwords[1:]:
+            for k in (QUERY_CACHE_KINDS if kind == "all" else [kind]):
+                if k in gens: gens[k] += 1
+
+    def _queryCacheKey(self, sender, msgwords):
+        # $asc and $streak with no player look up whoever asked
+        args = msgwords[1:] or ([sender] if msgwords[0] in ("asc", "streak") else [])
+        return (msgwords[0], " ".join(args))
+
+    def _cachedAnswers(self, key):
+        # slave -> answer, for the slaves whose answer to this we already have
+        if key[0] not in QUERY_CACHE: return {}
+        kind = QUERY_CACHE[key[0]][0]
+        answers = {}
+        for sl in self.slaves:
+            if sl not in self.slave_gens: continue
+            hit, entry = self.query_cache.get(key + (sl,))
+            if hit and entry[0] == self.slave_gens[sl][kind]:
+                answers[sl] = entry[1]
+        self.query_cache_counts["hits"] += len(answers)
+        self.query_cache_counts["misses"] += len(self.slaves) - len(answers)
+        return answers
+
+    def _cacheAnswer(self, q, sender):
+        # remember a slave's answer, unless it has told us it changed since we asked
+        if sender not in q["gens"] or sender not in q["resp"]: return
+        kind, ttl = QUERY_CACHE[q["key"][0]]
+        if self.slave_gens.get(sender, {}).get(kind) == q["gens"][sender]:
+            self.query_cache.put(q["key"] + (sender,), (q["gens"][sender], q["resp"][sender]), ttl)
+
     #R# / #P#
     def doResponse(self, sender, replyto, msgwords):
-        # called when slave returns query response to master
+        # called when an older slave returns query response to master
         # msgwords is [ #R#, <query_id>, [server-tag], command output, ...]
         # for long resps ([ #P#, <query>, output ]) * n, finishing with #R# msg as above
         # Assumes message fragments arrive in the same order as sent. Yeah, yeah I know...
+        # (that's what #F# is for)
         if sender in self.slaves and msgwords[1] in self.queries:
             self.queries[msgwords[1]]["resp"][sender] = self.queries[msgwords[1]]["resp"].get(sender,"") + " ".join(msgwords[2:])
-            if msgwords[0] == "#R#": self.queries[msgwords[1]]["finished"][sender] = True
-            if set(self.queries[msgwords[1]]["finished"].keys()) >= set(self.slaves.keys()):
-                #all slaves have responded
-                self.queries[msgwords[1]]["callback"](self.queries.pop(msgwords[1]))
+            if msgwords[0] == "#R#": self._finishResponse(msgwords[1], sender)
+        else:
+            tlog(f"Late or bogus slave response from {sender}: {' '.join(msgwords)[:100]}")
+
+    #F#
+    def doFrame(self, sender, replyto, msgwords):
+        # called when slave returns a framed query response to master
+        # msgwords is [ #F#, <query_id>, <seq>/<count>, <crc32>, <encoding>, payload... ]
+        # The frames can arrive in any order; the response is complete once we have
+        # all <count> of them, and only used if the crc32 matches.
+        if sender not in self.slaves or len(msgwords) < 5 or msgwords[1] not in self.queries:
+            tlog(f"Late or bogus slave frame from {sender}: {' '.join(msgwords)[:100]}")
+            return
+        query = msgwords[1]
+        try:
+            seq, count = (int(n) for n in msgwords[2].split("/"))
+            crc = int(msgwords[3], 16)
+        except ValueError:
+            tlog(f"Bogus slave frame from {sender}: {' '.join(msgwords)[:100]}")
+            return
+        encoding = msgwords[4]
+        frames = self.queries[query]["frames"].setdefault(sender, {"header": (count, crc, encoding), "parts": {}})
+        if frames["header"] != (count, crc, encoding) or not 0 <= seq < count:
+            tlog(f"WARNING: Query {query}: frame {msgwords[2]} from {sender} doesn't match the others")
+            return
+        frames["parts"][seq] = " ".join(msgwords[5:])
+        if len(frames["parts"]) < count: return
+        del self.queries[query]["frames"][sender]
+        try:
+            text = decode_frames(encoding, "".join(frames["parts"][i] for i in range(count)))
+            if zlib.crc32(text.encode("utf-8")) != crc:
+                raise ValueError("checksum mismatch")
+        except (ValueError, zlib.error) as e:
+            tlog(f"WARNING: Query {query}: Bad response from {sender} ({e})")
         else:
-            tlog(f"Bogus slave response from {sender}: {' '.join(msgwords)}")
+            self.queries[query]["resp"][sender] = text
+        self._finishResponse(query, sender)
+
+    def _finishResponse(self, query, sender):
+        # sender has said all it's going to; call back if that's everyone we're
+        # waiting for, or we already have the answer (e.g. found the $whereis player)
+        q = self.queries[query]
+        q["finished"][sender] = True
+        self.slave_health[sender].answered(time.monotonic() - q["sent"])
+        self._cacheAnswer(q, sender)
+        if not q["answered"]:
+            if set(q["finished"].keys()) >= q["waitfor"] or self.queryDone.get(q["cmd"], lambda q: False)(q):
+                self._answerQuery(q)
+        if set(q["finished"].keys()) >= q["targets"]:
+            # all slaves have responded
+            del self.queries[query]
+
+    def _answerQuery(self, q):
+        # call back with the complete responses we have so far
+        q["answered"] = True
+        if q["callback"]:
+            q["callback"](dict(q, resp = {s: r for s, r in q["resp"].items() if s in q["finished"]}))
 
     # As above, but timed out receiving one or more responses
-    def doQueryTimeout(self, query):
+    # probes: this is the later timeout for down slaves we probed (see forwardQuery)
+    def doQueryTimeout(self, query, probes = False):
         # This gets called regardless, so only process if query still exists
         if query not in self.queries: return
+        q = self.queries[query]
+        probed = q["targets"] - q["waitfor"]
 
-        noResp = []
-        for i in self.slaves.keys():
-            if not self.queries[query]["finished"].get(i,False):
-                noResp.append(i)
+        noResp = sorted((probed if probes else q["waitfor"]) - set(q["finished"].keys()))
+        for sl in noResp:
+            self.slave_health[sl].missed()
         if noResp:
-            tlog(f"WARNING: Query {query}: No response from {self.listStuff(noResp)}")
-        self.queries[query]["callback"](self.queries.pop(query))
+            tlog(f"WARNING: Query {query}: No response from {', '.join(noResp)}")
+        if not q["answered"]:
+            self._answerQuery(q)
+        # keep listening for probes until they've had the full QUERY_TIMEOUT
+        if probes or not probed:
+            del self.queries[query]
+
+    def _logSlaveLatency(self):
+        for sl in sorted(self.slave_health):
+            health = self.slave_health[sl]
+            if health.latency is None and not health.misses: continue
+            tlog(f"Slave {sl} latency: {health.describe()}" + (" (down)" if health.down else ""))
 
-    #S#
     def checkMilestones(self, sender, replyto, msgwords):
         numbers = { 1000000: "One million",
                     5000000: "Five million",
@@ -1140,6 +2493,7 @@ class DeathBotProtocol(irc.IRCClient):
         periodStr = { "hour" : "\x02Hourly Stats\x0f at %F %H:00 %Z: ",
                       "day"  : "\x02DAILY STATS\x0f AT %F %H:00 %Z: ",
                       "news" : "\x02Current Day\x0f as of %F %H:%M %Z: ",
+                      "period": "\x02Stats for {period}\x0f as of %F %H:%M %Z: ",
                       "full" : "\x02FINAL TOURNAMENT STATISTICS:\x0f "
                     }
         # hourly, we report one of role/race/etc. Daily, and for news, we report them all
@@ -1168,7 +2522,7 @@ class DeathBotProtocol(irc.IRCClient):
             rt //= 24
             stats["d"] = int(rt)
 
-        msg_parts = [time.strftime(periodStr[p]) + "Games: {games}, Asc: {ascend}, Scum: {scum}. ".format(**stats)]
+        msg_parts = [(time.strftime(periodStr[p]) + "Games: {games}, Asc: {ascend}, Scum: {scum}. ").format(**stats)]
 
         if stats["games"] != 0:
             # Add stat1 messages
@@ -1191,12 +2545,12 @@ class DeathBotProtocol(irc.IRCClient):
 
         if p != "full":
             for c in chanlist:
-                self.msgLog(c, statmsg)
+                self.queueMsg(c, statmsg)
         else:
             for c in chanlist:
-                self.msgLog(c, statmsg)
-                self.msgLog(c, "We hope you enjoyed The November Nethack Tournament.")
-                self.msgLog(c, "Thank you for playing.")
+                self.queueMsg(c, statmsg)
+                self.queueMsg(c, "We hope you enjoyed The November Nethack Tournament.")
+                self.queueMsg(c, "Thank you for playing.")
 
     def startCountdown(self,event,time):
         self.announce(f"The tournament {event}s in {time}...",True)
@@ -1211,6 +2565,7 @@ class DeathBotProtocol(irc.IRCClient):
 
         # Clean up old rate limiting data
         self._cleanupRateLimits()
+        self._logSlaveLatency()
 
         # special case handling for start/end
         # we are running at the top of the hour
@@ -1248,7 +2603,17 @@ class DeathBotProtocol(irc.IRCClient):
         self.checkTNNTAPI()
         # Schedule to run every 5 minutes from now on
         self.looping_calls["api"] = task.LoopingCall(self.checkTNNTAPI)
-        self.looping_calls["api"].start(300, now=False)  # 300 seconds = 5 minutes
+        self.looping_calls["api"].start(API_POLL_INTERVAL, now=False)
+
+    def _probeReactorLag(self):
+        """Measure how late this looping call fired, i.e. how long the reactor was blocked."""
+        now = time.monotonic()
+        lag = now - self.lag_probe_last - REACTOR_LAG_INTERVAL
+        self.lag_probe_last = now
+        if lag > self.reactor_lag_max:
+            self.reactor_lag_max = lag
+        if lag > REACTOR_LAG_WARN:
+            tlog(f"Reactor lag: event loop was blocked for {lag:.2f}s")
 
     # Countdown timer
     def countDown(self):
@@ -1316,9 +2681,8 @@ class DeathBotProtocol(irc.IRCClient):
                 self.respond(replyto, sender, f"Scoreboard data not yet loaded. Check: {self.scoresURL}")
                 return
 
-            # Sort players by wins then by name
-            sorted_players = sorted(self.player_scores.items(),
-                                  key=lambda x: (-x[1]["wins"], x[0]))[:5]
+            # Players are ranked by wins then by name
+            sorted_players = self.player_board.top(5)
 
             # Check if top player has any wins (0-win rankings are just alphabetical)
             if sorted_players and sorted_players[0][1]["wins"] == 0:
@@ -1338,34 +2702,75 @@ class DeathBotProtocol(irc.IRCClient):
             # Look up specific player
             player_name = " ".join(msgwords[1:])
 
-            if player_name not in self.player_scores:
+            found = self.player_board.find(player_name)
+            if not found:
                 # Try fetching directly from API if not in cache
-                try:
-                    r = requests.get(f"{TNNT_API_BASE}/players/{player_name}/",
-                                   headers=TNNT_API_HEADERS, timeout=5)
-                    if r.status_code == 200:
-                        data = r.json()
-                        clan_text = f" (clan: {data['clan']})" if data.get('clan') else ""
-                        response = (f"{player_name}{clan_text}: {data['wins']} wins out of "
-                                  f"{data['total_games']} games ({data['ratio']}) | Z-score: {data['zscore']}")
-                        self.respond(replyto, sender, response)
-                    else:
-                        self.respond(replyto, sender, f"Player '{player_name}' not found. Check: {self.scoresURL}")
-                except Exception:
-                    self.respond(replyto, sender, f"Error fetching player data. Check: {self.scoresURL}")
+                d = self._cachedAPILookup(("player", player_name), f"/players/{player_name}/")
+                d.addCallback(self._replyPlayerLookup, replyto, sender, player_name)
+                d.addErrback(lambda failure: self.respond(replyto, sender, f"Error fetching player data. Check: {self.scoresURL}"))
             else:
                 # Use cached data
-                data = self.player_scores[player_name]
+                rank, player_name, data = found
                 clan_text = f" (clan: {data['clan']})" if data['clan'] else ""
 
-                # Find player's rank
-                sorted_players = sorted(self.player_scores.items(),
-                                      key=lambda x: (-x[1]["wins"], x[0]))
-                rank = next((i for i, (n, _) in enumerate(sorted_players, 1) if n == player_name), "?")
-
                 response = f"#{rank} {player_name}{clan_text}: {data['wins']} wins out of {data['total_games']} games ({data['ratio']})"
                 self.respond(replyto, sender, response)
 
+    def _replyPlayerLookup(self, data, replyto, sender, player_name):
+        if data is None:
+            self.respond(replyto, sender, f"Player '{player_name}' not found. Check: {self.scoresURL}")
+            return
+        clan_text = f" (clan: {data['clan']})" if data.get('clan') else ""
+        response = (f"{player_name}{clan_text}: {data['wins']} wins out of "
+                  f"{data['total_games']} games ({data['ratio']}) | Z-score: {data['zscore']}")
+        self.respond(replyto, sender, response)
+
+    def _replyClanLookup(self, data, replyto, sender, clan_name):
+        if data is None:
+            self.respond(replyto, sender, f"Clan '{clan_name}' not found. Check: https://tnnt.org/clans")
+            return
+        member_count = len(data.get('members', []))
+        response = (f"{clan_name}: {data['wins']} wins out of {data['total_games']} games "
+                  f"({data['ratio']}) | Members: {member_count}")
+        self.respond(replyto, sender, response)
+
+    def _cachedAPILookup(self, key, path):
+        """Look up a single API object (player or clan) for $score/$clanscore.
+
+        Answers from lookup_cache if possible, otherwise fetches in a worker
+        thread. Concurrent lookups of the same thing share one request.
+        Returns a Deferred firing with the decoded data, or None if it doesn't exist.
+        """
+        hit, data = self.lookup_cache.get(key)
+        if hit:
+            return defer.succeed(data)
+        d = defer.Deferred()
+        if key in self.lookups_inflight:
+            self.lookups_inflight[key].append(d)
+            return d
+        self.lookups_inflight[key] = [d]
+
+        def fetched(result):
+            status, data = result
+            if status in (200, 404):
+                self.lookup_cache.put(key, data)
+            for waiter in self.lookups_inflight.pop(key, []):
+                waiter.callback(data)
+
+        def failed(failure):
+            for waiter in self.lookups_inflight.pop(key, []):
+                waiter.errback(failure)
+
+        threads.deferToThread(self._fetchAPILookup, path).addCallbacks(fetched, failed)
+        return d
+
+    def _fetchAPILookup(self, path):
+        """Fetch a single API object (worker thread). Returns (status, data or None)"""
+        r = http_pool.api_get(path, timeout=5)
+        if r.status_code != 200:
+            return r.status_code, None
+        return r.status_code, r.json()
+
     def doClanTag(self, sender, replyto, msgwords):
         # ClanTag functionality removed - JSON scoreboard is deprecated
         self.respond(replyto, sender, f"Clan tags are no longer supported. Check the tournament scoreboard at: {self.scoresURL}")
@@ -1378,9 +2783,8 @@ class DeathBotProtocol(irc.IRCClient):
                 self.respond(replyto, sender, "Clan data not yet loaded. Check: https://tnnt.org/clans")
                 return
 
-            # Sort clans by rank
-            sorted_clans = sorted(self.clan_scores.items(),
-                                key=lambda x: x[1]["rank"])[:5]
+            # Clans are ranked by the API
+            sorted_clans = self.clan_board.top(5)
 
             # Check if top clan has any wins (0-win rankings are just alphabetical)
             if sorted_clans and sorted_clans[0][1]["wins"] == 0:
@@ -1399,25 +2803,16 @@ class DeathBotProtocol(irc.IRCClient):
             # Look up specific clan
             clan_name = " ".join(msgwords[1:])
 
-            if clan_name not in self.clan_scores:
+            found = self.clan_board.find(clan_name)
+            if not found:
                 # Try fetching directly from API if not in cache
-                try:
-                    r = requests.get(f"{TNNT_API_BASE}/clans/{clan_name}/",
-                                   headers=TNNT_API_HEADERS, timeout=5)
-                    if r.status_code == 200:
-                        data = r.json()
-                        member_count = len(data.get('members', []))
-                        response = (f"{clan_name}: {data['wins']} wins out of {data['total_games']} games "
-                                  f"({data['ratio']}) | Members: {member_count}")
-                        self.respond(replyto, sender, response)
-                    else:
-                        self.respond(replyto, sender, f"Clan '{clan_name}' not found. Check: https://tnnt.org/clans")
-                except Exception:
-                    self.respond(replyto, sender, "Error fetching clan data. Check: https://tnnt.org/clans")
+                d = self._cachedAPILookup(("clan", clan_name), f"/clans/{clan_name}/")
+                d.addCallback(self._replyClanLookup, replyto, sender, clan_name)
+                d.addErrback(lambda failure: self.respond(replyto, sender, "Error fetching clan data. Check: https://tnnt.org/clans"))
             else:
                 # Use cached data
-                data = self.clan_scores[clan_name]
-                response = f"#{data['rank']} {clan_name}: {data['wins']} wins out of {data['total_games']} games ({data['ratio']})"
+                rank, clan_name, data = found
+                response = f"#{rank} {clan_name}: {data['wins']} wins out of {data['total_games']} games ({data['ratio']})"
                 self.respond(replyto, sender, response)
 
     def doCommands(self, sender, replyto, msgwords):
@@ -1460,7 +2855,7 @@ class DeathBotProtocol(irc.IRCClient):
         query_count = len(self.queries) if hasattr(self, 'queries') else 0
 
         # Count cached messages
-        msg_count = len(self.tellbuf) if hasattr(self, 'tellbuf') else 0
+        msg_count = len(self.tellstore) if self.tellstore is not None else 0
 
         # Count rate limited users
         rate_limit_count = len(self.rate_limits) if hasattr(self, 'rate_limits') else 0
@@ -1468,6 +2863,12 @@ class DeathBotProtocol(irc.IRCClient):
         # Count users under abuse penalty
         abuse_penalty_count = len(self.abuse_penalties) if hasattr(self, 'abuse_penalties') else 0
 
+        # Worst reactor stall since startup
+        lag_max = getattr(self, 'reactor_lag_max', 0.0)
+
+        # HTTP keep-alive effectiveness
+        http_conns, http_reqs = http_pool.counters()
+
         # Build status message
         status_parts = []
         status_parts.append(f"Status: {NICK} on {SERVERTAG}")
@@ -1480,6 +2881,25 @@ class DeathBotProtocol(irc.IRCClient):
         status_parts.append(f"RateLimit: {rate_limit_count}")
         if abuse_penalty_count > 0:
             status_parts.append(f"AbusePenalty: {abuse_penalty_count}")
+        if REACTOR_LAG_PROBE:
+            status_parts.append(f"MaxLag: {lag_max:.2f}s")
+        if hasattr(self, 'slave_health') and not SLAVE:
+            slave_parts = []
+            for sl in sorted(self.slave_health):
+                health = self.slave_health[sl]
+                if health.down:
+                    slave_parts.append(f"{sl} down")
+                elif health.latency is not None:
+                    slave_parts.append(f"{sl} {health.latency * 1000:.0f}ms")
+            if slave_parts:
+                status_parts.append("Slaves: " + ", ".join(slave_parts))
+            status_parts.append(f"QueryCache: {len(self.query_cache)} answers, {self.query_cache_counts['hits']} hits/"
+                                f"{self.query_cache_counts['misses']} misses")
+        status_parts.append(f"HTTP: {http_conns} conns/{http_reqs - http_conns} reused/{http_pool.not_modified} not modified")
+        if hasattr(self, 'outqueues'):
+            out_depth = sum(len(q) for q in self.outqueues.values())
+            status_parts.append(f"Outbound: {out_depth} queued (max {self.out_maxdepth}), {self.out_counts['sent']} sent, "
+                                f"{self.out_counts['merged']} merged, {self.out_counts['dropped']} dropped")
 
         # GitHub monitoring status
         if hasattr(self, 'seen_github_commits') and not SLAVE and ENABLE_GITHUB:
@@ -1492,42 +2912,66 @@ class DeathBotProtocol(irc.IRCClient):
 
     # GitHub monitoring via Atom feed
     def checkGitHub(self):
-        """Check GitHub repos for new commits via Atom feed and announce them"""
+        """Check GitHub repos for new commits via Atom feed and announce them
+
+        The feeds are fetched in a worker thread (the pool retries a slow or
+        failing GitHub), then diffed and announced back on the reactor thread.
+        Returns a Deferred, so LoopingCall won't start a new check until this one is done.
+        """
         if SLAVE:
             return  # Only master bot monitors GitHub
         if not self.github_repos:
             return  # GitHub monitoring not configured
+        d = threads.deferToThread(self._fetchGitHubFeeds, list(self.github_repos))
+        d.addCallback(self._announceGitHub)
+        d.addErrback(lambda failure: tlog(f"Unexpected error checking GitHub: {failure.value}"))
+        return d
+
+    def _announceGitHub(self, feeds):
         all_new_commits = []  # Collect commits from all repos
-        for repo_config in self.github_repos:
-            new_commits = self._checkGitHubRepo(repo_config)
-            all_new_commits.extend(new_commits)
-        # Announce all new commits with delays to prevent flood kicks
-        for i, (msg, repo, short_hash, author) in enumerate(all_new_commits):
-            # Schedule message with one second delay between each
-            delay = i * 1.0
+        for repo_config, feed in feeds:
+            if feed is not None:
+                all_new_commits.extend(self._checkGitHubRepo(repo_config, feed))
+        # Announce all new commits, behind anything more important
+        for msg, repo, short_hash, author in all_new_commits:
             for channel in SPAMCHANNELS:
-                reactor.callLater(delay, self.msgLog, channel, msg)
+                self.queueMsg(channel, msg, OUT_GITHUB)
             # Debug log
-            tlog(f"GitHub: New commit in {repo}: {short_hash} by {author} (delayed {delay}s)")
+            tlog(f"GitHub: New commit in {repo}: {short_hash} by {author}")
         # Mark as initialized only after ALL repos have been checked
         if not self.github_initialized:
             self.github_initialized = True
 
-    def _checkGitHubRepo(self, repo_config):
-        """Check a single GitHub repo for new commits"""
+    def _fetchGitHubFeeds(self, repos):
+        """Fetch each repo's feed (worker thread). Returns [(repo_config, feed text or None)]"""
+        return [self._fetchGitHubFeed(repo_config) for repo_config in repos]
+
+    def _fetchGitHubFeed(self, repo_config):
+        """Fetch a repo's commit Atom feed. Returns (repo_config, feed text), or (repo_config, None) on error."""
         repo = repo_config["repo"]
         branch = repo_config.get("branch", "master")
-        new_commits = []  # Collect new commits to return
         try:
             # GitHub Atom feed for commits on specified branch
             url = f"https://github.com/{repo}/commits/{branch}.atom"
             headers = {"User-Agent": "TNNT IRC Bot/1.0"}
-            r = requests.get(url, headers=headers, timeout=10)
+            r = http_pool.get(url, headers=headers, timeout=10)
             if r.status_code != 200:
                 tlog(f"GitHub Atom feed for {repo} returned status {r.status_code}")
-                return new_commits
+                return repo_config, None
+            return repo_config, r.text
+        except requests.exceptions.Timeout:
+            tlog(f"Timeout checking GitHub Atom feed for {repo}")
+        except requests.exceptions.RequestException as e:
+            tlog(f"Error fetching GitHub Atom feed for {repo}: {e}")
+        return repo_config, None
+
+    def _checkGitHubRepo(self, repo_config, feed):
+        """Find the new commits in a single GitHub repo's Atom feed"""
+        repo = repo_config["repo"]
+        new_commits = []  # Collect new commits to return
+        try:
             # Parse the Atom feed
-            root = ET.fromstring(r.text)
+            root = ET.fromstring(feed)
             # GitHub uses Atom format
             ns = {'atom': 'http://www.w3.org/2005/Atom'}
             entries = root.findall('atom:entry', ns)
@@ -1576,12 +3020,6 @@ class DeathBotProtocol(irc.IRCClient):
                 commit_list = list(self.seen_github_commits[repo])
                 self.seen_github_commits[repo] = set(commit_list[-50:])
             return new_commits
-        except requests.exceptions.Timeout:
-            tlog(f"Timeout checking GitHub Atom feed for {repo}")
-            return new_commits
-        except requests.exceptions.RequestException as e:
-            tlog(f"Error fetching GitHub Atom feed for {repo}: {e}")
-            return new_commits
         except ET.ParseError as e:
             tlog(f"Error parsing GitHub Atom XML for {repo}: {e}")
             return new_commits
@@ -1591,22 +3029,243 @@ class DeathBotProtocol(irc.IRCClient):
 
     # TNNT API monitoring for scoreboard functionality
     def checkTNNTAPI(self):
-        """Check TNNT API for achievement/trophy/ranking changes"""
+        """Check TNNT API for achievement/trophy/ranking changes
+
+        The HTTP requests run in a worker thread so the reactor keeps reading
+        IRC and tailing logs while a poll is in flight. The results are diffed
+        against our tracking state back on the reactor thread.
+        Returns a Deferred (so LoopingCall won't start a new poll until this one is done).
+        """
         if SLAVE:
             return  # Only master bot monitors API
+        if self.api_poll_running:
+            tlog("TNNT API: Previous poll still in progress, skipping")
+            return
+        self.api_poll_running = True
+        # only ask for a 304 if we still hold the scoreboard from the last poll
+        d = threads.deferToThread(self._fetchScoreboard, self.api_initialized and bool(self.player_scores))
+        d.addCallback(self._fetchAwards)
+        d.addCallback(self._processTNNTAPI)
+        d.addErrback(self._apiPollFailed)
+        d.addBoth(self._apiPollFinished)
+        return d
+
+    def _apiPollFailed(self, failure):
+        if failure.check(requests.exceptions.Timeout):
+            tlog("Timeout checking TNNT API")
+        elif failure.check(requests.exceptions.RequestException):
+            tlog(f"Error fetching TNNT API: {failure.value}")
+        else:
+            tlog(f"Unexpected error checking TNNT API: {failure.value}")
 
+    def _apiPollFinished(self, result):
+        self.api_poll_running = False
+        return None # never hand a failure back to LoopingCall, it would stop polling
+
+    def _fetchScoreboard(self, conditional):
+        """Fetch the scoreboard (worker thread).
+        Returns the decoded data, API_NOT_MODIFIED on a 304, or None on HTTP error.
+        """
+        # Fetch scoreboard data (now returns ALL players and clans with no limits)
+        r = http_pool.api_get("/scoreboard/", timeout=10, conditional=conditional)
+        if r.status_code == 304:
+            return API_NOT_MODIFIED
+        if r.status_code != 200:
+            tlog(f"TNNT API scoreboard returned status {r.status_code}")
+            return None
+        return r.json()
+
+    def _fetchAwards(self, data):
+        """Fetch trophy/achievement changes, from the bulk feed if the API has one.
+
+        Returns a Deferred firing with (scoreboard data, details, feed): either
+        details is {player: (player_data, achievements)} from the per-player
+        endpoints and feed is None, or details is empty and feed is the
+        decoded bulk feed.
+        """
+        if data is None:
+            return None
+        if self.api_feed_supported is False and time.time() - self.api_feed_checked < API_FEED_RETRY:
+            return self._fetchAllPlayerDetails(data)
+        d = threads.deferToThread(self._fetchAwardFeed, self.api_feed_cursor)
+        d.addCallback(self._awardFeedFetched, data)
+        return d
+
+    def _fetchAwardFeed(self, cursor):
+        """Fetch the bulk award feed (worker thread).
+
+        The feed is {"cursor": ..., "reset": bool, "events": [{"player": name,
+        "kind": "trophy"|"achievement", "name": award, "removed": bool}, ...]}
+        listing every award change since cursor (or every award, with no
+        cursor, or if the API no longer recognises ours, in which case
+        "reset" is true). Returns the decoded feed, None if the API has
+        no feed, or False on any other error.
+        """
+        path = TNNT_API_FEED
+        if cursor is not None:
+            path += "?" + urllib.parse.urlencode({"since": cursor})
+        r = http_pool.api_get(path, timeout=30)
+        if r.status_code == 404:
+            return None
+        if r.status_code != 200:
+            tlog(f"TNNT API: HTTP {r.status_code} fetching award feed")
+            return False
+        try:
+            feed = r.json()
+        except ValueError as e:
+            tlog(f"TNNT API: JSON decode error for award feed: {e}")
+            return False
+        if not isinstance(feed, dict) or not isinstance(feed.get("events"), list) or "cursor" not in feed:
+            tlog(f"TNNT API: Invalid award feed structure: {type(feed)}")
+            return False
+        return feed
+
+    def _awardFeedFetched(self, feed, data):
+        if feed is None:
+            # no bulk feed on this API - fall back to asking every player
+            if self.api_feed_supported is not False:
+                tlog("TNNT API: No bulk award feed, using per-player requests")
+            self.api_feed_supported = False
+            self.api_feed_checked = time.time()
+            return self._fetchAllPlayerDetails(data)
+        if feed is False:
+            return data, {}, None # feed broken this time, try again next poll
+        if not self.api_feed_supported:
+            tlog("TNNT API: Using bulk award feed")
+        self.api_feed_supported = True
+        return data, {}, feed
+
+    def _fetchAllPlayerDetails(self, data):
+        """Fan out the per-player fetches, at most API_CONCURRENCY at a time.
+
+        Returns a Deferred firing with (scoreboard data, {player: (player_data, achievements)}, None).
+        """
+        if data is None:
+            return None
+        player_names = self._playersToFetch(data)
+        sem = defer.DeferredSemaphore(API_CONCURRENCY)
+        # conditional requests only for players whose trophies and achievements we still hold
+        fetches = [sem.run(threads.deferToThread, self._fetchPlayerDetails, player_name,
+                           player_name in self.player_trophies and player_name in self.player_achievements
+                           and player_name not in self.recently_cleared_players)
+                   for player_name in player_names]
+        d = defer.gatherResults(fetches, consumeErrors=True)
+        d.addCallback(lambda results: (data, dict(zip(player_names, results)), None))
+        return d
+
+    def _playerFingerprint(self, scores):
+        """The scoreboard fields that change when a player finishes a game"""
+        return (scores["wins"], scores["total_games"])
+
+    def _playersToFetch(self, data):
+        """Pick the players whose trophies/achievements need refetching this poll.
+
+        Achievements only change when a game ends, which shows up on the
+        scoreboard as a change in wins/total_games. So we refetch players
+        whose row changed (or who we know nothing about), plus a slice of
+        API_SWEEP_SIZE unchanged players, round-robin, to catch anything the
+        scoreboard can't show (e.g. trophies moving from one player to another).
+        """
+        if data is API_NOT_MODIFIED:
+            # scoreboard unchanged, so only retries and the sweep can need fetching
+            rows = [dict(scores, name=name) for name, scores in self.player_scores.items()]
+        else:
+            rows = data.get("players", [])
+        player_names = [p["name"] for p in rows]
+        if not API_DIRTY_POLLING or not self.api_initialized:
+            return player_names
+
+        dirty = []
+        clean = []
+        for player_data in rows:
+            player_name = player_data["name"]
+            old_scores = self.player_scores.get(player_name)
+            if (old_scores is None
+                    or player_name not in self.player_achievements
+                    or player_name in self.recently_cleared_players
+                    or player_name in self.api_retry_players
+                    or self._playerFingerprint(old_scores) != self._playerFingerprint(player_data)):
+                dirty.append(player_name)
+            else:
+                clean.append(player_name)
+
+        sweep = []
+        if clean and API_SWEEP_SIZE > 0:
+            clean.sort()
+            start = self.api_sweep_pos % len(clean)
+            sweep = (clean[start:] + clean[:start])[:API_SWEEP_SIZE]
+            self.api_sweep_pos = start + len(sweep)
+        tlog(f"TNNT API: Fetching {len(dirty)} changed and {len(sweep)} sweep players of {len(player_names)}")
+        return dirty + sweep
+
+    def _fetchPlayerDetails(self, player_name, conditional=False):
+        """Fetch trophies and achievements for a single player (worker thread)
+
+        Returns (player_data, achievements). Either may be None if the request
+        failed, in which case the reason has already been logged, or
+        API_NOT_MODIFIED if conditional and the API says nothing changed.
+        """
         try:
-            # Fetch scoreboard data (now returns ALL players and clans with no limits)
-            r = requests.get(f"{TNNT_API_BASE}/scoreboard/", headers=TNNT_API_HEADERS, timeout=10)
+            # Fetch player details including trophies
+            r = http_pool.api_get(f"/players/{player_name}/", timeout=10, conditional=conditional)
+            if r.status_code == 304:
+                player_data = API_NOT_MODIFIED
+            elif r.status_code != 200:
+                tlog(f"TNNT API: HTTP {r.status_code} fetching player data for {player_name}")
+                return None, None  # Player might not exist or API error
+            else:
+                try:
+                    player_data = r.json()
+                except ValueError as e:
+                    tlog(f"TNNT API: JSON decode error for {player_name}: {e}")
+                    return None, None
+
+                # Don't bother fetching achievements if the player data is garbage
+                if not player_data or not isinstance(player_data, dict):
+                    return player_data, None
+
+            # Fetch achievements
+            r = http_pool.api_get(f"/players/{player_name}/achievements/", timeout=10, conditional=conditional)
+            if r.status_code == 304:
+                return player_data, API_NOT_MODIFIED
             if r.status_code != 200:
-                tlog(f"TNNT API scoreboard returned status {r.status_code}")
-                return
+                tlog(f"TNNT API: HTTP {r.status_code} fetching achievements for {player_name}")
+                return player_data, None
+
+            try:
+                achievements = r.json()
+            except ValueError as e:
+                tlog(f"TNNT API: JSON decode error for achievements of {player_name}: {e}")
+                return player_data, None
+
+            return player_data, achievements
+
+        except Exception as e:
+            # Log errors for debugging but don't abandon the rest of the poll
+            tlog(f"Error fetching achievements/trophies for {player_name}: {type(e).__name__}: {e}")
+            return None, None
 
-            data = r.json()
+    def _processTNNTAPI(self, fetched):
+        """Diff a completed API fetch against our tracking state and announce changes"""
+        if fetched is None:
+            return
+        data, details, feed = fetched
 
+        try:
             # Collect all announcements to send with delays
             all_announcements = []
 
+            if data is API_NOT_MODIFIED:
+                # Scoreboard unchanged: no scores, removals or rankings to diff,
+                # just the players the sweep refetched anyway
+                if feed is None:
+                    all_announcements.extend(self._checkFetchedPlayers(list(details), details))
+                else:
+                    all_announcements.extend(self._checkAwardFeed(list(self.player_scores), feed))
+                self._scheduleAPIAnnouncements(all_announcements)
+                self._saveAPIState()
+                return
+
             # Get all player names from scoreboard
             all_player_names = [p["name"] for p in data.get("players", [])]
 
@@ -1625,11 +3284,11 @@ class DeathBotProtocol(irc.IRCClient):
                     "clan": player_data.get("clan", None)
                 }
 
-            # Check achievements for ALL players
-            for player_name in all_player_names:
-                player_announcements = self._checkPlayerAchievements(player_name)
-                if self.api_initialized:
-                    all_announcements.extend(player_announcements)
+            # Check achievements for every player we fetched this poll
+            if feed is None:
+                all_announcements.extend(self._checkFetchedPlayers(all_player_names, details))
+            else:
+                all_announcements.extend(self._checkAwardFeed(all_player_names, feed))
 
             # Clear data for players no longer in tournament (e.g., after database wipe)
             if self.api_initialized:
@@ -1685,170 +3344,223 @@ class DeathBotProtocol(irc.IRCClient):
             # Update stored rankings
             self.clan_rankings = new_clan_rankings
 
-            # Send all announcements with delays to prevent flood kicks
-            for i, announcement in enumerate(all_announcements):
-                msg = announcement[0]
-                # Schedule message with 1 second delay between each
-                delay = i * 1.0
-                # Check if this is a clan registration announcement (starts 24 hours early)
-                is_clan_registration = len(announcement) >= 4 and announcement[3] == "new"
-                early_hours = 24 if is_clan_registration else 0
-                # Use announce() method with strict tournament time (no grace period for API events)
-                reactor.callLater(delay, self.announce, msg, True, True, early_hours)
-                # Debug log
-                if len(announcement) >= 3:
-                    tlog(f"TNNT API: Scheduling announcement #{i+1} (delay {delay}s): {announcement[1]} - {announcement[2]}")
+            self._rebuildLeaderboards()
+            self._scheduleAPIAnnouncements(all_announcements)
 
             # Mark as initialized after first successful fetch
             if not self.api_initialized:
                 self.api_initialized = True
                 tlog(f"TNNT API: Initialized - tracking {len(all_player_names)} players and {len(self.clan_scores)} clans")
 
-        except requests.exceptions.Timeout:
-            tlog("Timeout checking TNNT API")
-        except requests.exceptions.RequestException as e:
-            tlog(f"Error fetching TNNT API: {e}")
+            self._saveAPIState()
+            # only now is it safe to ask for a 304 next time
+            http_pool.commit("/scoreboard/")
+
         except Exception as e:
             tlog(f"Unexpected error checking TNNT API: {e}")
 
-    def _checkPlayerAchievements(self, player_name):
-        """Check for new achievements and trophies for a specific player
-        Returns a list of announcement tuples (message, type, player, details)
+    def _saveAPIState(self):
+        """Snapshot the API tracking state to APISTATEJSON so a restart can diff against it.
+
+        Trophy/achievement names are stored once in a table and referred to
+        by index, which keeps the file small. The file is written in a
+        worker thread.
         """
-        announcements = []
+        names = {}
+        def idx(award):
+            return names.setdefault(award, len(names))
+        players = {}
+        for player_name in set(self.player_trophies) | set(self.player_achievements):
+            players[player_name] = [sorted(idx(t) for t in self.player_trophies.get(player_name, ())),
+                                    sorted(idx(a) for a in self.player_achievements.get(player_name, ()))]
+        state = { "version"      : 1,
+                  "names"        : list(names),
+                  "players"      : players,
+                  "scores"       : self.player_scores,
+                  "clan_scores"  : self.clan_scores,
+                  "clan_rankings": self.clan_rankings,
+                  "cleared"      : sorted(self.recently_cleared_players),
+                  "retry"        : sorted(self.api_retry_players),
+                  "feed_cursor"  : self.api_feed_cursor }
+        text = json.dumps(state, separators=(",", ":"))
+        d = threads.deferToThread(atomic_write, APISTATEJSON, text)
+        d.addErrback(lambda failure: tlog(f"TNNT API: Could not save state to {APISTATEJSON}: {failure.value}"))
+
+    def _loadAPIState(self):
+        """Restore tracking state saved by _saveAPIState, so the first poll is a normal diff"""
         try:
-            # Fetch player details including trophies
-            r = requests.get(f"{TNNT_API_BASE}/players/{player_name}/",
-                           headers=TNNT_API_HEADERS, timeout=10)
-            if r.status_code != 200:
-                tlog(f"TNNT API: HTTP {r.status_code} fetching player data for {player_name}")
-                return announcements  # Player might not exist or API error
+            with open(APISTATEJSON) as f:
+                state = json.load(f)
+        except (IOError, OSError):
+            return # no saved state - normal for a fresh install
+        except json.JSONDecodeError as e:
+            tlog(f"Error: Invalid JSON in {APISTATEJSON}: {e}")
+            return
+        if state.get("version") != 1:
+            tlog(f"TNNT API: Ignoring saved state with unknown version {state.get('version')}")
+            return
+        try:
+            names = state["names"]
+            for player_name, (trophies, achievements) in state["players"].items():
+                self.player_trophies[player_name] = {names[i] for i in trophies}
+                self.player_achievements[player_name] = {names[i] for i in achievements}
+            self.player_scores = state["scores"]
+            self.clan_scores = state["clan_scores"]
+            self.clan_rankings = state["clan_rankings"]
+            self.recently_cleared_players = set(state["cleared"])
+            self.api_retry_players = set(state["retry"])
+            self.api_feed_cursor = state["feed_cursor"]
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            tlog(f"TNNT API: Saved state in {APISTATEJSON} is damaged ({e}), starting from scratch")
+            self.player_trophies = {}
+            self.player_achievements = {}
+            self.player_scores = {}
+            self.clan_scores = {}
+            self.clan_rankings = {}
+            self.recently_cleared_players = set()
+            self.api_retry_players = set()
+            self.api_feed_cursor = None
+            return
+        self._rebuildLeaderboards()
+        self.api_initialized = True
+        tlog(f"TNNT API: Restored saved state - tracking {len(self.player_scores)} players and {len(self.clan_scores)} clans")
 
-            try:
-                player_data = r.json()
-            except ValueError as e:
-                tlog(f"TNNT API: JSON decode error for {player_name}: {e}")
-                return announcements
-
-            # Validate response structure
-            if not player_data or not isinstance(player_data, dict):
-                tlog(f"TNNT API: Invalid player data structure for {player_name}: {type(player_data)}")
-                return announcements
-
-            # Check if this player was recently cleared (database rebuild scenario)
-            was_recently_cleared = player_name in self.recently_cleared_players
-            if was_recently_cleared:
-                tlog(f"TNNT API: Player {player_name} returned after being cleared")
-                self.recently_cleared_players.discard(player_name)
-                # Check if we should suppress announcements for database rebuilds
-                if not ANNOUNCE_AFTER_DB_REBUILD:
-                    tlog(f"TNNT API: Suppressing re-announcements for {player_name} (ANNOUNCE_AFTER_DB_REBUILD=False)")
-
-            # Check for new trophies - with defensive validation
-            trophies_list = player_data.get("trophies", [])
-            if not isinstance(trophies_list, list):
-                tlog(f"TNNT API: Invalid trophies format for {player_name}: expected list, got {type(trophies_list)}")
-                trophies_list = []
-
-            current_trophies = set()
-            for t in trophies_list:
-                if isinstance(t, dict) and "name" in t and t["name"]:
-                    current_trophies.add(t["name"])
-                else:
-                    tlog(f"TNNT API: Malformed trophy data for {player_name}: {t}")
-            # Determine if we should check for new trophies
-            is_tracked_player = player_name in self.player_trophies
-            is_new_player = self.api_initialized and not is_tracked_player and not was_recently_cleared
-            should_announce = is_tracked_player or (was_recently_cleared and current_trophies and ANNOUNCE_AFTER_DB_REBUILD) or is_new_player
-
-            if should_announce:
-                if is_tracked_player:
-                    new_trophies = current_trophies - self.player_trophies[player_name]
+    def _rebuildLeaderboards(self):
+        """Re-rank players (by wins, then name) and clans (by API rank) for $score/$clanscore"""
+        self.player_board = Leaderboard(self.player_scores, key=lambda x: (-x[1]["wins"], x[0]))
+        self.clan_board = Leaderboard(self.clan_scores, key=lambda x: x[1]["rank"])
+
+    def _checkFetchedPlayers(self, player_names, details):
+        """Diff each fetched player in turn, returns the announcements to make"""
+        announcements = []
+        for player_name in player_names:
+            if player_name not in details:
+                continue # unchanged since last poll
+            player_data, achievements = details[player_name]
+            if player_data is None or achievements is None:
+                self.api_retry_players.add(player_name)
+            else:
+                self.api_retry_players.discard(player_name)
+            player_announcements = self._checkPlayerAchievements(player_name, player_data, achievements)
+            if self.api_initialized:
+                announcements.extend(player_announcements)
+        return announcements
+
+    def _scheduleAPIAnnouncements(self, all_announcements):
+        # Queue all announcements - the outbound queue paces them and merges a
+        # player's awards if it's backed up
+        for i, announcement in enumerate(all_announcements):
+            msg = announcement[0]
+            # Check if this is a clan registration announcement (starts 24 hours early)
+            is_clan_registration = len(announcement) >= 4 and announcement[3] == "new"
+            early_hours = 24 if is_clan_registration else 0
+            # trophy/achievement announcements carry the awards themselves
+            award = [announcement[2], announcement[1], announcement[4]] if len(announcement) >= 5 else None
+            # Use announce() method with strict tournament time (no grace period for API events)
+            self.announce(msg, True, True, early_hours, OUT_ACHIEVEMENT, award)
+            # Debug log
+            if len(announcement) >= 3:
+                tlog(f"TNNT API: Queueing announcement #{i+1}: {announcement[1]} - {announcement[2]}")
+
+    def _checkAwardFeed(self, player_names, feed):
+        """Diff the bulk award feed against our tracking state.
+
+        Builds each touched player's current trophy/achievement sets from
+        what we had plus the feed's additions/removals, then runs the same
+        diff as the per-player path. Players we aren't tracking yet get
+        an entry too, so later awards count as new.
+        Returns a list of announcement tuples (message, type, player, details)
+        """
+        # a full listing replaces what we have rather than adding to it
+        full = self.api_feed_cursor is None or feed.get("reset", False)
+        changes = {} # (player, kind) -> (added, removed)
+        for event in feed["events"]:
+            if (not isinstance(event, dict) or event.get("kind") not in self.award_kinds
+                    or not event.get("player") or not event.get("name")):
+                tlog(f"TNNT API: Malformed award feed event: {event}")
+                continue
+            added, removed = changes.setdefault((event["player"], event["kind"]), (set(), set()))
+            if event.get("removed", False):
+                added.discard(event["name"])
+                removed.add(event["name"])
+            else:
+                removed.discard(event["name"])
+                added.add(event["name"])
+
+        announcements = []
+        for player_name in player_names:
+            touched = (player_name, "trophy") in changes or (player_name, "achievement") in changes
+            untracked = player_name not in self.player_trophies or player_name not in self.player_achievements
+            if not (full or touched or untracked):
+                continue
+            was_recently_cleared = self._playerReturned(player_name)
+            player_announcements = []
+            for kind, tracked in (("trophy", self.player_trophies), ("achievement", self.player_achievements)):
+                added, removed = changes.get((player_name, kind), (set(), set()))
+                if full:
+                    current = set(added)
                 else:
-                    # Player was cleared or is brand new - treat all trophies as new
-                    new_trophies = current_trophies
-                    if is_new_player and new_trophies:
-                        tlog(f"TNNT API: New player detected - {player_name} has {len(new_trophies)} trophies")
-                if new_trophies:
-                    count = len(new_trophies)
-                    trophy_list = list(new_trophies)
-
-                    if count == 1:
-                        msg = f"[{self.displaystring['trophy']}] {player_name} now has {trophy_list[0]}."
-                    elif count == 2:
-                        msg = f"[{self.displaystring['trophy']}] {player_name} now has {trophy_list[0]} and {trophy_list[1]}."
-                    elif count == 3:
-                        msg = f"[{self.displaystring['trophy']}] {player_name} now has {trophy_list[0]}, {trophy_list[1]}, and {trophy_list[2]}."
-                    elif count == 4:
-                        msg = f"[{self.displaystring['trophy']}] {player_name} now has {trophy_list[0]}, {trophy_list[1]}, {trophy_list[2]}, and {trophy_list[3]}."
-                    else:
-                        msg = f"[{self.displaystring['trophy']}] {player_name} now has {count} new trophies."
+                    current = (tracked.get(player_name, set()) | added) - removed
+                player_announcements.extend(self._diffAwards(player_name, kind, current, was_recently_cleared))
+            if self.api_initialized:
+                announcements.extend(player_announcements)
 
-                    announcements.append((msg, "trophy", player_name, str(new_trophies)))
-                    tlog(f"TNNT API: New trophies - {player_name}: {new_trophies}")
-            self.player_trophies[player_name] = current_trophies
+        self.api_feed_cursor = feed["cursor"]
+        return announcements
 
-            # Fetch achievements
-            r = requests.get(f"{TNNT_API_BASE}/players/{player_name}/achievements/",
-                           headers=TNNT_API_HEADERS, timeout=10)
-            if r.status_code != 200:
-                tlog(f"TNNT API: HTTP {r.status_code} fetching achievements for {player_name}")
-                return announcements
+    def _playerReturned(self, player_name):
+        """Check (and clear) whether this player was recently cleared (database rebuild scenario)"""
+        if player_name not in self.recently_cleared_players:
+            return False
+        tlog(f"TNNT API: Player {player_name} returned after being cleared")
+        self.recently_cleared_players.discard(player_name)
+        # Check if we should suppress announcements for database rebuilds
+        if not ANNOUNCE_AFTER_DB_REBUILD:
+            tlog(f"TNNT API: Suppressing re-announcements for {player_name} (ANNOUNCE_AFTER_DB_REBUILD=False)")
+        return True
 
-            try:
-                achievements = r.json()
-            except ValueError as e:
-                tlog(f"TNNT API: JSON decode error for achievements of {player_name}: {e}")
-                return announcements
+    def _checkPlayerAchievements(self, player_name, player_data, achievements):
+        """Check for new achievements and trophies for a specific player
+        player_data and achievements are the decoded API responses from
+        _fetchPlayerDetails (None if the fetch failed, API_NOT_MODIFIED if
+        the API told us nothing changed since our last fetch).
+        Returns a list of announcement tuples (message, type, player, details)
+        """
+        announcements = []
+        if player_data is None:
+            return announcements  # fetch failed, already logged
+        try:
+            was_recently_cleared = False
+            if player_data is not API_NOT_MODIFIED:
+                # Validate response structure
+                if not player_data or not isinstance(player_data, dict):
+                    tlog(f"TNNT API: Invalid player data structure for {player_name}: {type(player_data)}")
+                    return announcements
+
+                # Check if this player was recently cleared (database rebuild scenario)
+                was_recently_cleared = self._playerReturned(player_name)
+
+                # Check for new trophies - with defensive validation
+                trophies_list = player_data.get("trophies", [])
+                if not isinstance(trophies_list, list):
+                    tlog(f"TNNT API: Invalid trophies format for {player_name}: expected list, got {type(trophies_list)}")
+                    trophies_list = []
+                current_trophies = self._awardNames(player_name, "trophy", trophies_list)
+                announcements.extend(self._diffAwards(player_name, "trophy", current_trophies, was_recently_cleared))
+                http_pool.commit(f"/players/{player_name}/")
+
+            if achievements is None:
+                return announcements  # fetch failed, already logged
+            if achievements is API_NOT_MODIFIED:
+                return announcements  # nothing new since last poll
 
             # Validate achievements response
             if not isinstance(achievements, list):
                 tlog(f"TNNT API: Invalid achievements format for {player_name}: expected list, got {type(achievements)}")
                 achievements = []
-
-            current_achievements = set()
-            for a in achievements:
-                if isinstance(a, dict) and "name" in a and a["name"]:
-                    current_achievements.add(a["name"])
-                else:
-                    tlog(f"TNNT API: Malformed achievement data for {player_name}: {a}")
-
-            # Determine if we should check for new achievements
-            is_tracked_player_ach = player_name in self.player_achievements
-            is_new_player_ach = self.api_initialized and not is_tracked_player_ach and not was_recently_cleared
-            should_announce_ach = is_tracked_player_ach or (was_recently_cleared and current_achievements and ANNOUNCE_AFTER_DB_REBUILD) or is_new_player_ach
-
-            if should_announce_ach:
-                if is_tracked_player_ach:
-                    new_achievements = current_achievements - self.player_achievements[player_name]
-                    if new_achievements:
-                        tlog(f"TNNT API: Player {player_name} has {len(new_achievements)} new achievements (was tracked)")
-                    else:
-                        tlog(f"TNNT API: Player {player_name} checked - no new achievements (has {len(current_achievements)} total)")
-                else:
-                    # Player was cleared or is brand new - treat all achievements as new
-                    new_achievements = current_achievements
-                    if is_new_player_ach and new_achievements:
-                        tlog(f"TNNT API: New player detected - {player_name} has {len(new_achievements)} achievements")
-                if new_achievements:
-                    count = len(new_achievements)
-                    achievement_list = list(new_achievements)
-
-                    if count == 1:
-                        msg = f"[{self.displaystring['achieve']}] {player_name} just earned {achievement_list[0]}."
-                    elif count == 2:
-                        msg = f"[{self.displaystring['achieve']}] {player_name} just earned {achievement_list[0]} and {achievement_list[1]}."
-                    elif count == 3:
-                        msg = f"[{self.displaystring['achieve']}] {player_name} just earned {achievement_list[0]}, {achievement_list[1]}, and {achievement_list[2]}."
-                    elif count == 4:
-                        msg = f"[{self.displaystring['achieve']}] {player_name} just earned {achievement_list[0]}, {achievement_list[1]}, {achievement_list[2]}, and {achievement_list[3]}."
-                    else:
-                        msg = f"[{self.displaystring['achieve']}] {player_name} just earned {count} new achievements."
-
-                    announcements.append((msg, "achievement", player_name, str(new_achievements)))
-                    tlog(f"TNNT API: New achievements - {player_name}: {new_achievements}")
-
-            self.player_achievements[player_name] = current_achievements
+            current_achievements = self._awardNames(player_name, "achievement", achievements)
+            announcements.extend(self._diffAwards(player_name, "achievement", current_achievements, was_recently_cleared))
+            http_pool.commit(f"/players/{player_name}/achievements/")
 
         except Exception as e:
             # Log errors for debugging but don't crash the bot
@@ -1859,6 +3571,70 @@ class DeathBotProtocol(irc.IRCClient):
 
         return announcements
 
+    def _awardNames(self, player_name, kind, awards):
+        """Pull the set of names out of a list of trophy/achievement dicts from the API"""
+        names = set()
+        for a in awards:
+            if isinstance(a, dict) and "name" in a and a["name"]:
+                names.add(a["name"])
+            else:
+                tlog(f"TNNT API: Malformed {kind} data for {player_name}: {a}")
+        return names
+
+    # kind -> (displaystring key, verb, plural)
+    award_kinds = { "trophy"     : ("trophy",  "now has",     "trophies"),
+                    "achievement": ("achieve", "just earned", "achievements") }
+
+    def _formatAwards(self, player_name, kind, new_awards):
+        """Build the announcement line for a player's new trophies or achievements"""
+        tag, verb, plural = self.award_kinds[kind]
+        count = len(new_awards)
+        award_list = list(new_awards)
+
+        if count == 1:
+            what = award_list[0]
+        elif count == 2:
+            what = f"{award_list[0]} and {award_list[1]}"
+        elif count <= 4:
+            what = ", ".join(award_list[:-1]) + f", and {award_list[-1]}"
+        else:
+            what = f"{count} new {plural}"
+        return f"[{self.displaystring[tag]}] {player_name} {verb} {what}."
+
+    def _diffAwards(self, player_name, kind, current, was_recently_cleared):
+        """Compare a player's current trophies/achievements with what we had, and record the new set.
+        Returns a list of announcement tuples (message, type, player, details)
+        """
+        tracked = self.player_trophies if kind == "trophy" else self.player_achievements
+        plural = self.award_kinds[kind][2]
+        announcements = []
+
+        # Determine if we should check for new awards
+        is_tracked_player = player_name in tracked
+        is_new_player = self.api_initialized and not is_tracked_player and not was_recently_cleared
+        should_announce = is_tracked_player or (was_recently_cleared and current and ANNOUNCE_AFTER_DB_REBUILD) or is_new_player
+
+        if should_announce:
+            if is_tracked_player:
+                new_awards = current - tracked[player_name]
+                if kind == "achievement":
+                    if new_awards:
+                        tlog(f"TNNT API: Player {player_name} has {len(new_awards)} new achievements (was tracked)")
+                    else:
+                        tlog(f"TNNT API: Player {player_name} checked - no new achievements (has {len(current)} total)")
+            else:
+                # Player was cleared or is brand new - treat all awards as new
+                new_awards = current
+                if is_new_player and new_awards:
+                    tlog(f"TNNT API: New player detected - {player_name} has {len(new_awards)} {plural}")
+            if new_awards:
+                msg = self._formatAwards(player_name, kind, new_awards)
+                announcements.append((msg, kind, player_name, str(new_awards), list(new_awards)))
+                tlog(f"TNNT API: New {plural} - {player_name}: {new_awards}")
+
+        tracked[player_name] = current
+        return announcements
+
     def takeMessage(self, sender, replyto, msgwords):
         if len(msgwords) < 3:
             self.respond(replyto, sender, f"{TRIGGER}tell <recipient> <message> (leave a message for someone)")
@@ -1876,14 +3652,11 @@ class DeathBotProtocol(irc.IRCClient):
             message = "[private] " + message
         else: # !tell on channel
             forwardto = replyto # so pass to channel
-        if not self.tellbuf.get(rcpt.lower(),False):
-            self.tellbuf[rcpt.lower()] = []
-        self.tellbuf[rcpt.lower()].append((forwardto,sender,time.time(),message))
-        self.tellbuf.sync()
+        self.tellstore.add(rcpt, forwardto, sender, time.time(), message)
         # Sanitize sender and recipient names to prevent format string injection
         safe_sender = sanitize_format_string(sender)
         safe_rcpt = sanitize_format_string(rcpt)
-        self.msgLog(replyto,random.choice(willDo).format(safe_sender,safe_rcpt))
+        self.queueMsg(replyto,random.choice(willDo).format(safe_sender,safe_rcpt))
 
     def msgTime(self, stamp):
         # Timezone handling is not great, but the following seems to work.
@@ -1896,14 +3669,15 @@ class DeathBotProtocol(irc.IRCClient):
         # but first... deal with the "bonus" colours and leading @ symbols of discord users
         if user[0] == '@':
             plainuser = self.stripText(user).lower()
-            if not self.tellbuf.get(plainuser,None):
+            if plainuser not in self.tellstore:
                 plainuser = plainuser[1:] # strip the leading @ and try again (below)
         else:
             plainuser = user.lower()
-        if not self.tellbuf.get(plainuser,None): return
+        if plainuser not in self.tellstore: return
+        messages = self.tellstore.get(plainuser)
         nicksfrom = []
-        if len(self.tellbuf[plainuser]) > 2 and user[0] != '@':
-            for (forwardto,sender,ts,message) in self.tellbuf[plainuser]:
+        if len(messages) > 2 and user[0] != '@':
+            for (forwardto,sender,ts,message) in messages:
                 if forwardto.lower() != user.lower(): # don't add sender to list if message was private
                     if sender not in nicksfrom: nicksfrom += [sender]
                 self.respond(user,user, f"Message from {sender} at {self.msgTime(ts)}: {message}")
@@ -1927,15 +3701,16 @@ class DeathBotProtocol(irc.IRCClient):
                 self.respond(CHANNEL, user, f"Messages from {fromstr} have been forwarded to you privately.");
 
         else:
-            for (forwardto,sender,ts,message) in self.tellbuf[plainuser]:
+            for (forwardto,sender,ts,message) in messages:
                 self.respond(forwardto, user, f"Message from {sender} at {self.msgTime(ts)}: {message}")
-        del self.tellbuf[plainuser]
-        self.tellbuf.sync()
+        self.tellstore.remove(plainuser)
 
     QUERY_ID = 0 # just use a sequence number for now
     def newQueryId(self):
         self.QUERY_ID += 1
-        return str(self.QUERY_ID)
+        # old slaves just echo the id back, new ones see they can answer with #F#
+        # and if they can send #I#, we can cache their answers
+        return str(self.QUERY_ID) + INVALIDATE_QUERY + FRAMED_QUERY
 
     queries = {}
 
@@ -1948,20 +3723,57 @@ class DeathBotProtocol(irc.IRCClient):
         # [elsewhere]
         # record query responses, and call callback when all received (or timeout)
         # This all becomes easier if we just treat ourself (master) as one of the slaves
-        TIMEOUT = 5 # move this to config later
+        # Slaves that have stopped answering only get the odd query, and we don't wait for them.
+        # Slaves whose answer we already have (and haven't said it's changed) don't get asked.
+        now = time.monotonic()
+        key = self._queryCacheKey(sender, msgwords)
+        cached = self._cachedAnswers(key)
+        targets = [sl for sl in self.slaves.keys() if sl not in cached and self.slave_health[sl].shouldQuery(now)]
+        waitfor = [sl for sl in targets if not self.slave_health[sl].down]
+        if not (cached or targets):
+            # every server is down and already has a probe out - nothing to ask, nothing to wait for
+            self.respond(replyto, sender, "No servers are responding right now, try again shortly.")
+            return
         q = self.newQueryId()
         self.queries[q] = {}
         self.queries[q]["callback"] = callback
         self.queries[q]["replyto"] = replyto
         self.queries[q]["sender"] = sender
-        self.queries[q]["resp"] = {}
-        self.queries[q]["finished"] = {}
+        self.queries[q]["cmd"] = msgwords[0]
+        self.queries[q]["resp"] = dict(cached)
+        self.queries[q]["finished"] = dict.fromkeys(cached, True)
+        self.queries[q]["frames"] = {} # slave -> #F# frames so far
+        self.queries[q]["targets"] = set(targets)
+        self.queries[q]["waitfor"] = set(waitfor)
+        self.queries[q]["answered"] = False
+        self.queries[q]["sent"] = now
+        self.queries[q]["key"] = key
+        # what we knew of each slave's answers when we asked, so we don't cache one that's already stale
+        self.queries[q]["gens"] = {}
+        if key[0] in QUERY_CACHE:
+            kind = QUERY_CACHE[key[0]][0]
+            self.queries[q]["gens"] = {sl: self.slave_gens[sl][kind] for sl in targets if sl in self.slave_gens}
+        if cached and (not waitfor or self.queryDone.get(msgwords[0], lambda q: False)(self.queries[q])):
+            # the cache has all we need - only the probes of down slaves still go out
+            self._answerQuery(self.queries[q])
+            targets = [sl for sl in targets if sl not in waitfor]
+            waitfor = []
+            self.queries[q]["targets"] = set(targets)
+            self.queries[q]["waitfor"] = set()
+            if not targets:
+                del self.queries[q]
+                return
         message = f"#Q# {' '.join([q, sender] + msgwords)}"
 
-        for sl in list(self.slaves.keys()):
+        for sl in targets:
             if TEST: tlog("forwardQuery: " + sl + " " + message)
             self.msg(sl,message)
-        reactor.callLater(TIMEOUT, self.doQueryTimeout, q)
+        if not self.queries[q]["answered"]:
+            timeout = max([self.slave_health[sl].timeout() for sl in waitfor] or [QUERY_TIMEOUT_MIN])
+            reactor.callLater(timeout, self.doQueryTimeout, q)
+        if len(targets) > len(waitfor):
+            # a down slave may be slow to start with, don't hold that against it
+            reactor.callLater(QUERY_TIMEOUT, self.doQueryTimeout, q, True)
 
     # Multi-server command entry point (forwards query to slaves)
     def multiServerCmd(self, sender, replyto, msgwords):
@@ -1971,28 +3783,55 @@ class DeathBotProtocol(irc.IRCClient):
         if self.slaves:
             self.forwardQuery(sender, replyto, msgwords, self.callBacks.get(msgwords[0],None))
 
+    # slave: answer a query from master. Framed (#F#) if master says it can take
+    # that, otherwise in 200 character #P# chunks and a final #R#.
+    def sendResponse(self, master, query, text):
+        if query.endswith(FRAMED_QUERY):
+            room = self.lineRoom(master) - utf8_len(f"#F# {query} 9999/9999 ffffffff z ")
+            crc, encoding, payloads = encode_frames(text, room)
+            for seq, payload in enumerate(payloads):
+                self.queueMsg(master, f"#F# {query} {seq}/{len(payloads)} {crc:08x} {encoding} {payload}")
+            return
+        respChunks = self.blowChunks(text, 200) or [""]
+        lastChunk = respChunks.pop()
+        while respChunks:
+            self.queueMsg(master, f"#P# {query} {respChunks.pop(0)}")
+        self.queueMsg(master, f"#R# {query} {lastChunk}")
+
     def blowChunks(self, line, n):
         # split line into a list of chunks of max n chars
         # https://stackoverflow.com/questions/9475241/split-string-every-nth-character
         return [line[i:i+n] for i in range(0, len(line), n)]
 
+    def usageStats(self, sender, replyto, msgwords):
+        if len(msgwords) > 2 or (len(msgwords) == 2 and not stats_window(msgwords[1].lower(), datetime.now())):
+            self.respond(replyto, sender, TRIGGER + msgwords[0] + " [today|yesterday|hour|lasthour|<N>h|<N>d|all]"
+                                          " - games played in that time.")
+            return False
+        return True
+
     # !stats (or server generated hstats, etc)
     def getStats(self, master, sender, query, msgwords):
-        statPeriod = { "stats" : "day", "cstats" : "day", "dstats": "day", "hstats": "hour", "fstats": "full" }
-        statType = { "stats" : "news", "cstats" : "news" } # so far today...
-        period = statPeriod[msgwords[0]]
-        p = statType.get(msgwords[0],period)
-        response = p + " " + json.dumps(self.stats[period])
-        respChunks = self.blowChunks(response, 200)
-        lastChunk = respChunks.pop()
-        while respChunks:
-            self.msg(master, f"#P# {query} {respChunks.pop(0)}")
-        self.msg(master, f"#R# {query} {lastChunk}")
-        if msgwords[0] == "stats": return # don't init any stats
-        self.initStats("hour")
-        if msgwords[0] == "hstats": return # don't init day/full stats
-        if msgwords[0] == "cstats": return # don't init day/full stats
-        self.initStats("day")
+        # the period each one reports on. The scheduled ones run at the top of the
+        # hour, so allow for them running a bit either side of it.
+        statPeriod = { "stats" : "today", "cstats" : "today", "dstats": "yesterday", "hstats": "lasthour", "fstats": "all" }
+        statType = { "stats" : "news", "cstats" : "news", "dstats": "day", "hstats": "hour", "fstats": "full" }
+        nowtime = datetime.now()
+        if msgwords[0] in ("hstats", "dstats"):
+            nowtime += timedelta(seconds=STATS_SLACK)
+        p = statType[msgwords[0]]
+        if msgwords[0] == "stats" and len(msgwords) > 1:
+            p = "period"
+            period = msgwords[1].lower()
+        else:
+            period = statPeriod[msgwords[0]]
+        window = stats_window(period, nowtime)
+        if not window: return # bogus input, should have been handled in usage check above
+        start, end, description = window
+        stats = self.gamestats.window(start, end)
+        if p == "period":
+            stats["period"] = description
+        self.sendResponse(master, query, p + " " + json.dumps(stats, separators=(",", ":")))
 
     def outStats(self, q):
         aggStats = {}
@@ -2005,30 +3844,23 @@ class DeathBotProtocol(irc.IRCClient):
                 if rrga not in aggStats: aggStats[rrga] = {}
                 for rrga_item in stat[rrga]:
                     aggStats[rrga][rrga_item] = aggStats[rrga].get(rrga_item,0) + stat[rrga][rrga_item]
+            if "period" in stat: aggStats["period"] = stat["period"]
         replyto = None
-        if statType == "news": replyto = q["replyto"]
+        if statType in ("news", "period"): replyto = q["replyto"]
         self.spamStats(statType, aggStats, replyto)
 
     # !players - respond to forwarded query and actually pull the info
     def getPlayers(self, master, sender, query, msgwords):
-        players = []
-        for var in list(self.inprog.keys()):
-            for inpdir in self.inprog[var]:
-                for inpfile in glob.iglob(inpdir + "*.ttyrec"):
-                    # /stuff/crap/PLAYER:shit:garbage.ttyrec
-                    # we want AFTER last '/', BEFORE 1st ':'
-                    players.append(inpfile.split("/")[-1].split(":")[0])
+        players = self.live_games.players()
         if players:
             plrvar = " ".join(players) + " "
         else:
             plrvar = "No current players"
-        response = f"#R# {query} {self.displaytag(SERVERTAG)} {plrvar}"
-        self.msg(master, response)
+        self.sendResponse(master, query, f"{self.displaytag(SERVERTAG)} {plrvar}")
 
     # !players callback. Actually print the output.
     def outPlayers(self,q):
-        outmsg = " :: ".join(list(q["resp"].values()))
-        self.respond(q["replyto"],q["sender"],outmsg)
+        self.respondList(q["replyto"],q["sender"],list(q["resp"].values())," :: ")
 
     def usageWhereIs(self, sender, replyto, msgwords):
         if (len(msgwords) != 2):
@@ -2042,38 +3874,33 @@ class DeathBotProtocol(irc.IRCClient):
         # Validate player name to prevent path traversal
         player_name = msgwords[1]
         if "/" in player_name or ".." in player_name or "\\" in player_name:
-            self.msg(master, f"#R# {query} {self.displaytag(SERVERTAG)} Invalid player name.")
+            self.sendResponse(master, query, f"{self.displaytag(SERVERTAG)} Invalid player name.")
             return
 
-        # look for inrpogress file first, only report active games
-        for var in list(self.inprog.keys()):
-            for inpdir in self.inprog[var]:
-                for inpfile in glob.iglob(inpdir + "*.ttyrec"):
-                    plr = inpfile.split("/")[-1].split(":")[0]
-                    if plr.lower() == msgwords[1].lower():
-                        for widir in self.whereis[var]:
-                            for wipath in glob.iglob(widir + "*.whereis"):
-                                if wipath.split("/")[-1].lower() == (msgwords[1] + ".whereis").lower():
-                                    plr = wipath.split("/")[-1].split(".")[0] # Correct case
-                                    with open(wipath, "rb") as f:
-                                        wirec = parse_xlogfile_line(f.read(),":")
-
-                                    self.msg(master, "#R# " + query
-                                             + " " + self.displaytag(SERVERTAG) + " " + plr
-                                             + " : ({role} {race} {gender} {align}) T:{turns} ".format(**wirec)
-                                             + self.dungeons[wirec["dnum"]]
-                                             + " level: " + str(wirec["depth"])
-                                             + ammy[wirec["amulet"]])
-                                    return
-
-                        self.msg(master, "#R# " + query + " "
-                                                + self.displaytag(SERVERTAG)
-                                                + " " + plr + " "
-                                                + ": No details available")
-                        return
-        self.msg(master, "#R# " + query + " " + self.displaytag(SERVERTAG)
-                                        + " " + msgwords[1]
-                                        + " is not currently playing on this server.")
+        # only report active games
+        found = self.live_games.find(player_name)
+        if found is None:
+            self.sendResponse(master, query, self.displaytag(SERVERTAG)
+                                            + " " + msgwords[1]
+                                            + " is not currently playing on this server.")
+            return
+        plr, wirec = found
+        if wirec is None:
+            self.sendResponse(master, query, self.displaytag(SERVERTAG)
+                                            + " " + plr + " "
+                                            + ": No details available")
+            return
+        self.sendResponse(master, query,
+                          self.displaytag(SERVERTAG) + " " + plr
+                          + " : ({role} {race} {gender} {align}) T:{turns} ".format(**wirec)
+                          + self.dungeons[wirec["dnum"]]
+                          + " level: " + str(wirec["depth"])
+                          + ammy[wirec["amulet"]])
+
+    # a $whereis is answered as soon as one server has the player playing
+    def foundWhereIs(self, q):
+        return any(" is not currently playing" not in q["resp"].get(server, " is not currently playing")
+                   for server in q["finished"])
 
     def outWhereIs(self,q):
         player = ''
@@ -2083,9 +3910,8 @@ class DeathBotProtocol(irc.IRCClient):
                 player = q["resp"][server].split(" ")[1]
             else:
                 msgs += [q["resp"][server]]
-        outmsg = " | ".join(msgs)
-        if not outmsg: outmsg = player + " is not playing."
-        self.respond(q["replyto"],q["sender"],outmsg)
+        if not msgs: msgs = [player + " is not playing."]
+        self.respondList(q["replyto"],q["sender"],msgs)
 
     def usageAsc(self, sender, replyto, msgwords):
         if len(msgwords) < 3:
@@ -2101,12 +3927,14 @@ class DeathBotProtocol(irc.IRCClient):
         plr = PLR.lower()
         stats = ""
         totasc = 0
-        if not plr in self.asc:
+        player = self.players.get(plr)
+        asc = player and player.ascCounts()
+        if not asc:
             repl = self.displaytag(SERVERTAG) + " No ascensions for " + PLR
-            if plr in self.allgames:
-                repl += " in " + str(self.allgames[plr]) + " games"
+            if player:
+                repl += " in " + str(player.games) + " games"
             repl += "."
-            self.msg(master,"#R# " + query + " " + repl)
+            self.sendResponse(master, query, repl)
             return
         role_stats = []
         race_stats = []
@@ -2114,30 +3942,30 @@ class DeathBotProtocol(irc.IRCClient):
         gender_stats = []
 
         for role in NETHACK_ROLES:
-             if role in self.asc[plr]:
-                totasc += self.asc[plr][role]
-                role_stats.append(str(self.asc[plr][role]) + "x" + role)
+             if role in asc:
+                totasc += asc[role]
+                role_stats.append(str(asc[role]) + "x" + role)
 
         for race in NETHACK_RACES:
-            if race in self.asc[plr]:
-                race_stats.append(str(self.asc[plr][race]) + "x" + race)
+            if race in asc:
+                race_stats.append(str(asc[race]) + "x" + race)
 
         for alig in NETHACK_ALIGNS:
-            if alig in self.asc[plr]:
-                align_stats.append(str(self.asc[plr][alig]) + "x" + alig)
+            if alig in asc:
+                align_stats.append(str(asc[alig]) + "x" + alig)
 
         for gend in NETHACK_GENDERS:
-            if gend in self.asc[plr]:
-                gender_stats.append(str(self.asc[plr][gend]) + "x" + gend)
+            if gend in asc:
+                gender_stats.append(str(asc[gend]) + "x" + gend)
 
         stats = " ".join(role_stats) + ", " + " ".join(race_stats) + ", " + " ".join(align_stats) + ", " + " ".join(gender_stats) + "."
-        self.msg(master, "#R# " + query + " " + self.displaytag(SERVERTAG)
+        self.sendResponse(master, query, self.displaytag(SERVERTAG)
                          + " " + PLR
                          + " has ascended "
                          + str(totasc) + " times in "
-                         + str(self.allgames[plr])
+                         + str(player.games)
                          + " games ({:0.2f}%):".format((100.0 * totasc)
-                                               / self.allgames[plr])
+                                               / player.games)
                          + stats)
         return
 
@@ -2149,9 +3977,8 @@ class DeathBotProtocol(irc.IRCClient):
                 fallback_msg = q["resp"][server]
             else:
                msgs += [q["resp"][server]]
-        outmsg = " | ".join(msgs)
-        if not outmsg: outmsg = fallback_msg
-        self.respond(q["replyto"],q["sender"],outmsg)
+        if not msgs: msgs = [fallback_msg]
+        self.respondList(q["replyto"],q["sender"],msgs)
 
     def usageStreak(self, sender, replyto, msgwords):
         if len(msgwords) > 2: return False
@@ -2167,17 +3994,15 @@ class DeathBotProtocol(irc.IRCClient):
             PLR = sender
         if not PLR: return # bogus input, handled by usage check.
         plr = PLR.lower()
-        (lstart,lend,llength) = self.longstreak.get(plr,(0,0,0))
-        (cstart,cend,clength) = self.curstreak.get(plr,(0,0,0))
-
-        reply_parts = ["#R#", query]
+        player = self.players.get(plr)
+        (lstart,lend,llength) = player and player.longstreak or (0,0,0)
+        (cstart,cend,clength) = player and player.curstreak or (0,0,0)
 
         if llength == 0:
-            reply = " ".join(reply_parts) + " No streaks for " + PLR + "."
-            self.msg(master,reply)
+            self.sendResponse(master, query, "No streaks for " + PLR + ".")
             return
 
-        reply_parts.extend([self.displaytag(SERVERTAG), PLR])
+        reply_parts = [self.displaytag(SERVERTAG), PLR]
         reply_parts.append("Max: {} ({} - {})".format(
             llength, self.streakDate(lstart), self.streakDate(lend)))
 
@@ -2188,34 +4013,37 @@ class DeathBotProtocol(irc.IRCClient):
                 reply_parts.append(". Current: {} (since {})".format(
                     clength, self.streakDate(cstart)))
 
-        reply = " ".join(reply_parts) + "."
-        self.msg(master,reply)
+        self.sendResponse(master, query, " ".join(reply_parts) + ".")
         return
 
+    def refURL(self, ref):
+        """Rebuild the dumplog URL of a game from its game_ref"""
+        name, starttime, turns, death, dumpfmt = ref
+        game = {"name": name, "starttime": starttime, "turns": turns, "death": death, "dumpfmt": dumpfmt}
+        return self.dumplogURL(game, self.startscummed(game))
+
     def getLastGame(self, master, sender, query, msgwords):
         if (len(msgwords) >= 2): #player specified
-            plr = msgwords[1].lower()
-            dl = self.lg.get(plr,False)
-            if not dl:
-                self.msg(master, "#R# " + query +
-                                 " No last game for " + msgwords[1] + ".")
+            player = self.players.get(msgwords[1].lower())
+            if not player or not player.lastgame:
+                self.sendResponse(master, query, "No last game for " + msgwords[1] + ".")
                 return
-            self.msg(master, "#R# " + query + " " + self.displaytag(SERVERTAG) + " " + dl)
+            self.sendResponse(master, query, self.displaytag(SERVERTAG) + " " + self.refURL(player.lastgame))
             return
         # no player
-        self.msg(master, "#R# " + query + " " + self.displaytag(SERVERTAG) + " " + self.lastgame)
+        dl = self.refURL(self.lastgame) if self.lastgame else "No last game recorded"
+        self.sendResponse(master, query, self.displaytag(SERVERTAG) + " " + dl)
 
     def getLastAsc(self, master, sender, query, msgwords):
         if (len(msgwords) >= 2):  #player specified
-            plr = msgwords[1].lower()
-            dl = self.la.get(plr,False)
-            if not dl:
-                self.msg(master, "#R# " + query +
-                                 " No last ascension for " + msgwords[1] + ".")
+            player = self.players.get(msgwords[1].lower())
+            if not player or not player.lastasc:
+                self.sendResponse(master, query, "No last ascension for " + msgwords[1] + ".")
                 return
-            self.msg(master, "#R# " + query + " " + self.displaytag(SERVERTAG) + " " + dl)
+            self.sendResponse(master, query, self.displaytag(SERVERTAG) + " " + self.refURL(player.lastasc))
             return
-        self.msg(master, "#R# " + query + " " + self.displaytag(SERVERTAG) + " " + self.lastasc)
+        dl = self.refURL(self.lastasc) if self.lastasc else "No last ascension recorded"
+        self.sendResponse(master, query, self.displaytag(SERVERTAG) + " " + dl)
 
     # Listen to the chatter
     def privmsg(self, sender, dest, message):
@@ -2278,7 +4106,8 @@ class DeathBotProtocol(irc.IRCClient):
             if msgwords[0] == "SPAM:":
                 msgwords = msgwords[1:]
                 spam = True
-            self.announce(" ".join(msgwords), spam)
+            line = " ".join(msgwords)
+            self.announce(line, spam, priority=self._announcePriority(line, spam))
 
     #other events for logging
     def action(self, doer, dest, message):
@@ -2329,7 +4158,7 @@ class DeathBotProtocol(irc.IRCClient):
 
     ### Xlog/livelog event processing
     def startscummed(self, game):
-        return game["death"].lower() in ["quit", "escaped"] and int(game["turns"]) <= 100
+        return game_startscummed(game)
 
     # shortgame tracks consecutive games < 100 turns
     # we report a summary of these rather than individually
@@ -2338,85 +4167,42 @@ class DeathBotProtocol(irc.IRCClient):
     def xlogfileReport(self, game, report = True):
         # lowercased name is used for lookups
         lname = game["name"].lower()
-        # "allgames" for a player even counts scummed games
-        if not lname in self.allgames:
-            self.allgames[lname] = 0
-        self.allgames[lname] += 1
+        player = self.players.get(lname)
+        if player is None:
+            player = self.players[lname] = PlayerRecord()
+        # game count for a player even counts scummed games
+        player.games += 1
         is_startscum = self.startscummed(game)
 
-        # collect hourly/daily stats for games that actually ended within the period
-        etime = fromtimestamp_int(game["endtime"])
-        ntime = datetime.now()
-        et = {}
-        nt = {}
-        et["hour"] = datetime(etime.year,etime.month,etime.day,etime.hour)
-        et["day"] = datetime(etime.year,etime.month,etime.day)
-        nt["hour"] = datetime(ntime.year,ntime.month,ntime.day,ntime.hour)
-        nt["day"] = datetime(ntime.year,ntime.month,ntime.day)
-        for period in ["hour","day","full"]:
-            if period == "full" or et[period] == nt[period]:
-                self.stats[period]["games"] += 1
-                if is_startscum:
-                    self.stats[period]["scum"] += 1
-                else: # only count non-scums in rrga stats
-                    for rrga in ["role","race","gender","align"]:
-                        self.stats[period][rrga][game[rrga]] = self.stats[period][rrga].get(game[rrga],0) + 1
-                for tp in ["turns","points","realtime"]:
-                    self.stats[period][tp] += int(game[tp])
-                if game["death"] == "ascended":
-                    self.stats[period]["ascend"] += 1
-
-        dumplog = game.get("dumplog",False)
-        # Need to figure out the dump path before messing with the name below
-        dumpfile = (self.dump_file_prefix + game["dumpfmt"]).format(**game)
+        # hourly/daily stats are worked out from when each game ended when they're asked for
+        self.gamestats.addGame(game, is_startscum)
 
-        # Check if game was startscummed - those don't produce dumplogs
-        if is_startscum:
-            dumpurl = f"Game was startscummed ({game['turns']} turns, {game['death']}) - no dumplog exists"
-        else:
-            # Generate dumplog URL using new method that checks both local and S3
-            if TEST:
-                # In test mode, always generate a URL
-                dumpurl = urllib.parse.quote(game["dumpfmt"].format(**game))
-                dumpurl = self.dump_url_prefix.format(**game) + dumpurl
-            else:
-                # In production, use the new method that checks both local and S3
-                dumpurl = self.generate_dumplog_url(game, dumpfile)
-        self.lg[lname] = dumpurl
-        self.lastgame = dumpurl
+        # the dump URL is rebuilt from this when asked for, check now that it can be
+        (self.dump_file_prefix + game["dumpfmt"]).format(**game)
+        player.lastgame = self.lastgame = game_ref(game)
 
         if game["death"][0:8] in ("ascended"):
             # append dump url to report for ascensions
-            game["ascsuff"] = "\n" + dumpurl
+            game["ascsuff"] = "\n" + self.dumplogURL(game, is_startscum) if report else ""
             # !lastasc stats.
-            self.la[lname] = dumpurl
-            self.lastasc = dumpurl
+            player.lastasc = self.lastasc = player.lastgame
 
             # !asc stats
-            if not lname in self.asc: self.asc[lname] = {}
-            if not game["role"]   in self.asc[lname]: self.asc[lname][game["role"]]   = 0
-            if not game["race"]   in self.asc[lname]: self.asc[lname][game["race"]]   = 0
-            if not game["gender"] in self.asc[lname]: self.asc[lname][game["gender"]] = 0
-            if not game["align"]  in self.asc[lname]: self.asc[lname][game["align"]]  = 0
-            self.asc[lname][game["role"]]   += 1
-            self.asc[lname][game["race"]]   += 1
-            self.asc[lname][game["gender"]] += 1
-            self.asc[lname][game["align"]]  += 1
+            for rrga in ["role","race","gender","align"]:
+                player.addAsc(game[rrga])
 
             # streaks
-            (cs_start, cs_end, cs_length) = self.curstreak.get(lname,
-                                                      (game["starttime"],0,0))
-            cs_end = game["endtime"]
+            (cs_start, cs_end, cs_length) = player.curstreak or (compact_stamp(game["starttime"]),0,0)
+            cs_end = compact_stamp(game["endtime"])
             cs_length += 1
-            self.curstreak[lname] = (cs_start, cs_end, cs_length)
-            (ls_start, ls_end, ls_length) = self.longstreak.get(lname, (0,0,0))
+            player.curstreak = (cs_start, cs_end, cs_length)
+            (ls_start, ls_end, ls_length) = player.longstreak or (0,0,0)
             if cs_length > ls_length:
-                self.longstreak[lname] = self.curstreak[lname]
+                player.longstreak = player.curstreak
 
         else:   # not ascended - kill off any streak
             game["ascsuff"] = ""
-            if lname in self.curstreak:
-                del self.curstreak[lname]
+            player.curstreak = None
         # end of statistics gathering
 
         game["shortsuff"] = ""
@@ -2525,56 +4311,260 @@ class DeathBotProtocol(irc.IRCClient):
                    "killed {killed_shopkeeper} on T:{turns}").format(**event)
 
     def connectionLost(self, reason=None):
+        if self.out_drain and self.out_drain.active():
+            self.out_drain.cancel()
+        if self.tellstore is not None:
+            self.tellstore.close()
+            self.tellstore = None
         if self.looping_calls is None: return
         for call in self.looping_calls.values():
             call.stop()
+        # the next connection gets a new protocol, which sets up its own tailing
+        if self.notifier:
+            self.notifier.loseConnection()
+            self.notifier = None
+        for handle in self.log_handles.values():
+            handle.close()
+        self.log_handles = {}
 
     def updateSummary(self):
         # send most up-to-date full stats to master for milestone tracking
         # called every time a game ends, and on a timer in case master restarted.
         try:
-            summary_data = {k: self.stats["full"][k] for k in ('games', 'ascend', 'points', 'turns', 'realtime')}
+            summary_data = {k: self.gamestats.total[k] for k in ('games', 'ascend', 'points', 'turns', 'realtime')}
             for master in MASTERS:
                 self.msg(master, f"#S# {json.dumps(summary_data)}")
         except Exception as e:
             tlog(f"Error sending summary update: {e}")
 
-    def logReport(self, filepath):
+    def _saveCheckpoint(self):
+        """Save everything the startup xlogfile replay builds to XLOGSTATEJSON, with the
+        offset in each xlogfile it covers. The file is written in a worker thread.
+        """
+        files = {}
+        for filepath in self.xlogfiles:
+            offset = self.logs_seek.get(filepath, 0)
+            try:
+                fingerprint = log_fingerprint(filepath.path, offset)
+            except (IOError, OSError):
+                fingerprint = None
+            if fingerprint is None:
+                return # file has gone away or shrunk under us, try again next time
+            files[filepath.path] = [offset] + fingerprint
+        if files == self.checkpoint_files:
+            return # no new games
+        # game_refs are saved with their dumpfmt as an index into a table
+        formats = {}
+        def ref(r):
+            return r and r[:4] + (formats.setdefault(r[4], len(formats)),)
+        players = {lname: [player.games, player.ascCounts(), ref(player.lastgame), ref(player.lastasc),
+                           player.curstreak, player.longstreak]
+                   for lname, player in self.players.items()}
+        state = { "version"   : 4,
+                  "files"     : files,
+                  "stats"     : self.gamestats.saveState(),
+                  "players"   : players,
+                  "lastgame"  : ref(self.lastgame),
+                  "lastasc"   : ref(self.lastasc),
+                  "formats"   : list(formats),
+                  "shortgame" : self.shortgame }
+        text = json.dumps(state, separators=(",", ":"))
+        self.checkpoint_files = files
+        d = threads.deferToThread(atomic_write, XLOGSTATEJSON, text)
+        d.addErrback(lambda failure: tlog(f"Could not save xlogfile checkpoint to {XLOGSTATEJSON}: {failure.value}"))
+
+    def _loadCheckpoint(self):
+        """Restore the aggregates saved by _saveCheckpoint if every xlogfile still matches it.
+        Returns {path: offset} to carry on reading from, or None to read everything.
+        """
+        try:
+            with open(XLOGSTATEJSON) as f:
+                state = json.load(f)
+        except (IOError, OSError):
+            return None # no checkpoint yet
+        except json.JSONDecodeError as e:
+            tlog(f"Error: Invalid JSON in {XLOGSTATEJSON}: {e}")
+            return None
+        if state.get("version") != 4:
+            tlog(f"Ignoring xlogfile checkpoint with unknown version {state.get('version')}")
+            return None
+        try:
+            files = state["files"]
+            if set(files) != {filepath.path for filepath in self.xlogfiles}:
+                tlog("xlogfiles have changed since the last checkpoint, reading them in full")
+                return None
+            for path, (offset, inode, digest) in files.items():
+                if log_fingerprint(path, offset) != [inode, digest]:
+                    tlog(f"{path} no longer matches the last checkpoint, reading it in full")
+                    return None
+            gamestats = GameStats(self.gamestats.hours)
+            gamestats.merge(state["stats"])
+            formats = state["formats"]
+            def ref(r):
+                return r and (r[0], r[1], r[2], sys.intern(r[3]), formats[r[4]])
+            players = {}
+            for lname, (games, asc, lastgame, lastasc, curstreak, longstreak) in state["players"].items():
+                player = players[lname] = PlayerRecord()
+                player.games = games
+                for code, count in (asc or {}).items():
+                    player.addAsc(code, count)
+                player.lastgame, player.lastasc = ref(lastgame), ref(lastasc)
+                player.curstreak = curstreak and tuple(curstreak)
+                player.longstreak = longstreak and tuple(longstreak)
+            lastgame, lastasc = ref(state["lastgame"]), ref(state["lastasc"])
+            shortgame = state["shortgame"]
+        except (KeyError, TypeError, ValueError, IndexError, OSError) as e:
+            tlog(f"Error: Damaged xlogfile checkpoint {XLOGSTATEJSON} ({e}), reading xlogfiles in full")
+            return None
+        self.gamestats = gamestats
+        self.players = players
+        self.lastgame, self.lastasc = lastgame, lastasc
+        self.shortgame = shortgame
+        self.checkpoint_files = files
+        return {path: offset for path, (offset, inode, digest) in files.items()}
+
+    def _watchLogs(self):
+        """Watch the log directories with inotify so logReport runs as soon as a log changes.
+
+        We watch the directories rather than the files themselves, so we
+        also see a log being rotated or recreated.
+        Returns False if inotify isn't available, in which case we poll.
+        """
+        if inotify is None:
+            return False
+        try:
+            self.notifier = inotify.INotify()
+            self.notifier.startReading()
+            mask = inotify.IN_MODIFY | inotify.IN_CREATE | inotify.IN_MOVED_TO | inotify.IN_CLOSE_WRITE
+            watched = set()
+            for filepath in self.logs:
+                parent = filepath.parent()
+                self.log_watch[(parent.path, filepath.basename())] = filepath
+                if parent.path not in watched:
+                    self.notifier.watch(parent, mask=mask, callbacks=[self._logChanged])
+                    watched.add(parent.path)
+        except Exception as e:
+            tlog(f"Warning: inotify unavailable ({e}), polling logs every {LOG_POLL_INTERVAL}s")
+            if self.notifier:
+                self.notifier.loseConnection()
+            self.notifier = None
+            self.log_watch = {}
+            return False
+        # catch anything written between the startup read and setting up the watch
+        for filepath in self.logs:
+            self.logReport(filepath)
+        return True
+
+    def _watchGames(self):
+        """Watch the inprogress and whereis directories with the inotify we tail logs with.
+        Returns False if we don't have one, in which case we poll.
+        """
+        if not self.notifier:
+            return False
+        mask = inotify.IN_CREATE | inotify.IN_DELETE | inotify.IN_MOVED_TO | inotify.IN_MOVED_FROM
         try:
-            with filepath.open("r") as handle:
-                handle.seek(self.logs_seek[filepath])
+            for dirs in (self.inprog, self.whereis):
+                for var in dirs:
+                    for directory in dirs[var]:
+                        self.notifier.watch(filepath.FilePath(directory), mask=mask, callbacks=[self._gameChanged])
+        except Exception as e:
+            tlog(f"Warning: can't watch game directories ({e}), rescanning every {LOG_POLL_INTERVAL}s")
+            return False
+        # catch any game that started while we were setting up
+        self._rescanGames()
+        return True
 
-                for line in handle:
-                    try:
-                        delim = self.logs[filepath][2]
-                        game = parse_xlogfile_line(line, delim)
-                        game["dumpfmt"] = self.logs[filepath][3]
-                        spam = self.logs[filepath][4]
-                        for line in self.logs[filepath][0](game):
-                            # Check if this is a Croesus reaction (no server tag needed)
-                            if line.startswith("##CROESUS##"):
-                                line = line[11:]  # Strip the ##CROESUS## prefix
-                            else:
-                                line = f"{self.displaytag(SERVERTAG)} {line}"
-                            if SLAVE:
-                                if spam:
-                                    line = f"SPAM: {line}"
-                                for master in MASTERS:
-                                    self.msg(master, line)
-                            else:
-                                self.announce(line,spam)
-                        self.updateSummary()
-                    except Exception as e:
-                        tlog(f"Error processing log line from {filepath}: {e}")
-                        # Continue processing other lines
-                        continue
-
-                self.logs_seek[filepath] = handle.tell()
+    def _gameChanged(self, ignored, path, mask):
+        """inotify callback: a game started or ended, or a whereis file appeared"""
+        if self.live_games.fileChanged(path.asTextMode().path):
+            self._pushInvalidation("inprog")
+
+    def _logChanged(self, ignored, path, mask):
+        """inotify callback: something in a watched log directory changed"""
+        path = path.asTextMode()  # inotify hands us bytes paths
+        filepath = self.log_watch.get((path.parent().path, path.basename()))
+        if filepath is not None:
+            self.logReport(filepath)
+
+    def _openLog(self, filepath):
+        """Open a log for tailing, positioned where we left off"""
+        handle = filepath.open("r")
+        handle.seek(self.logs_seek.get(filepath, 0))
+        self.log_handles[filepath] = handle
+        return handle
+
+    def _readLogLines(self, handle):
+        """Read the complete lines appended to a log since we last looked.
+        A partly-written last line is left for next time.
+        """
+        data = handle.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            handle.seek(end - len(data), os.SEEK_CUR)
+        return [line for line, next_offset in scan_lines(data, 0, end)]
+
+    def logReport(self, filepath):
+        try:
+            handle = self.log_handles.get(filepath)
+            if handle is None:
+                handle = self._openLog(filepath)
+            else:
+                current = os.stat(filepath.path)
+                opened = os.fstat(handle.fileno())
+                if (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev):
+                    # log was rotated or recreated: finish off the old one, then start the new one from the top
+                    self._processLogLines(filepath, self._readLogLines(handle))
+                    handle.close()
+                    tlog(f"Log {filepath.path} was replaced, reading new file from the start")
+                    self.logs_seek[filepath] = 0
+                    handle = self._openLog(filepath)
+                elif current.st_size < handle.tell():
+                    tlog(f"Log {filepath.path} was truncated, reading from the start")
+                    handle.seek(0)
+
+            self._processLogLines(filepath, self._readLogLines(handle))
+            self.logs_seek[filepath] = handle.tell()
         except (IOError, OSError) as e:
             tlog("Error reading log file {}: {}".format(filepath, e))
-            # Don't update seek position on read error
+            # Don't update seek position on read error, reopen next time
+            handle = self.log_handles.pop(filepath, None)
+            if handle:
+                handle.close()
+
+    def _processLogLines(self, filepath, lines):
+        for line in lines:
+            try:
+                delim = self.logs[filepath][2]
+                game = parse_xlogfile_line(line, delim)
+                game["dumpfmt"] = self.logs[filepath][3]
+                spam = self.logs[filepath][4]
+                for line in self.logs[filepath][0](game):
+                    # Check if this is a Croesus reaction (no server tag needed)
+                    if line.startswith("##CROESUS##"):
+                        line = line[11:]  # Strip the ##CROESUS## prefix
+                    else:
+                        line = f"{self.displaytag(SERVERTAG)} {line}"
+                    priority = self._announcePriority(line, spam)
+                    if SLAVE:
+                        if spam:
+                            line = f"SPAM: {line}"
+                        for master in MASTERS:
+                            self.queueMsg(master, line, priority)
+                    else:
+                        self.announce(line, spam, priority=priority)
+                self.updateSummary()
+            except Exception as e:
+                tlog(f"Error processing log line from {filepath}: {e}")
+                # Continue processing other lines
+                continue
+        if lines and filepath in self.xlogfiles:
+            self._pushInvalidation("xlog")
 
 class DeathBotFactory(ReconnectingClientFactory):
+    # set once the first connection has read the xlogfiles, so reconnects don't fork
+    # XLOG_BULK_WORKERS again from a reactor that has API threads running by then
+    bulk_ingested = False
+
     def startedConnecting(self, connector):
         tlog('Started to connect.')
 